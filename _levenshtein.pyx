@@ -0,0 +1,57 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled Levenshtein distance, used when rapidfuzz is not installed.
+Build in place with: cythonize -i _levenshtein.pyx
+"""
+
+from libc.stdlib cimport malloc, free
+
+
+def levenshtein_distance(str s1, str s2):
+    """Calculate Levenshtein distance between two strings."""
+    cdef Py_ssize_t m, n, i, j
+    cdef Py_UCS4 c1
+    cdef int cost
+    cdef int *previous_row
+    cdef int *current_row
+    cdef int *swap
+    
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    
+    m = len(s1)
+    n = len(s2)
+    if n == 0:
+        return m
+    
+    previous_row = <int *> malloc((n + 1) * sizeof(int))
+    current_row = <int *> malloc((n + 1) * sizeof(int))
+    if previous_row == NULL or current_row == NULL:
+        free(previous_row)
+        free(current_row)
+        raise MemoryError()
+    
+    try:
+        for j in range(n + 1):
+            previous_row[j] = j
+        
+        for i in range(m):
+            c1 = s1[i]
+            current_row[0] = i + 1
+            for j in range(n):
+                # Cost of insertions, deletions, or substitutions
+                cost = previous_row[j] + (c1 != s2[j])
+                if previous_row[j + 1] + 1 < cost:
+                    cost = previous_row[j + 1] + 1
+                if current_row[j] + 1 < cost:
+                    cost = current_row[j] + 1
+                current_row[j + 1] = cost
+            
+            swap = previous_row
+            previous_row = current_row
+            current_row = swap
+        
+        return previous_row[n]
+    finally:
+        free(previous_row)
+        free(current_row)
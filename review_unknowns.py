@@ -5,34 +5,75 @@ Review unknown functions and suggest corrections.
 
 import os
 import json
+import heapq
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial, lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+# Try to import orjson for faster parsing of CodeBlocks.json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import rapidfuzz for fast (C++/SIMD) edit distance
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Otherwise use the compiled Cython helper if it has been built
+# (cythonize -i _levenshtein.pyx)
+try:
+    from _levenshtein import levenshtein_distance as compiled_levenshtein_distance
+    CYTHON_AVAILABLE = True
+except ImportError:
+    CYTHON_AVAILABLE = False
+
+
+@lru_cache(maxsize=1)
+def read_code_blocks_file(path='CodeBlocks.json'):
+    """Parse CodeBlocks.json once per process (with orjson when available)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
 
 def load_available_functions():
     """Load list of available functions from database."""
-    with open('CodeBlocks.json') as f:
-        blocks = json.load(f)
+    blocks = read_code_blocks_file()
     return sorted(set(b['title'].lower() for b in blocks))
 
 
 def levenshtein_distance(s1, s2):
     """Calculate Levenshtein distance between two strings."""
+    if RAPIDFUZZ_AVAILABLE:
+        return Levenshtein.distance(s1, s2)
+    if CYTHON_AVAILABLE:
+        return compiled_levenshtein_distance(s1, s2)
+    
     if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
+        s1, s2 = s2, s1
     
     if len(s2) == 0:
         return len(s1)
     
-    previous_row = range(len(s2) + 1)
+    # Two preallocated rows, swapped after each pass
+    previous_row = list(range(len(s2) + 1))
+    current_row = [0] * (len(s2) + 1)
     for i, c1 in enumerate(s1):
-        current_row = [i + 1]
+        current_row[0] = i + 1
         for j, c2 in enumerate(s2):
             # Cost of insertions, deletions, or substitutions
             insertions = previous_row[j + 1] + 1
             deletions = current_row[j] + 1
             substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
+            current_row[j + 1] = min(insertions, deletions, substitutions)
+        previous_row, current_row = current_row, previous_row
     
     return previous_row[-1]
 
@@ -42,6 +83,9 @@ def calculate_similarity(s1, s2):
     if not s1 or not s2:
         return 0.0
     
+    if RAPIDFUZZ_AVAILABLE:
+        return Levenshtein.normalized_similarity(s1, s2)
+    
     distance = levenshtein_distance(s1, s2)
     max_len = max(len(s1), len(s2))
     
@@ -50,6 +94,119 @@ def calculate_similarity(s1, s2):
     return similarity
 
 
+def build_length_index(available):
+    """Group available functions by name length for fast candidate pruning."""
+    index = {}
+    for func in available:
+        index.setdefault(len(func), []).append(func)
+    return index
+
+
+def viable_candidates(names, length_index, min_similarity=0.5):
+    """
+    Return (function, length) pairs that can score above min_similarity for
+    any of names. Edit distance is at least the length difference, so
+    similarity is at most 1 - |len(a) - len(b)| / max(len(a), len(b));
+    other lengths are skipped.
+    """
+    candidates = set()
+    for name in names:
+        name_len = len(name)
+        if not name_len:
+            continue
+        for length, funcs in length_index.items():
+            if 1.0 - abs(name_len - length) / max(name_len, length) > min_similarity:
+                candidates.update((func, length) for func in funcs)
+    return sorted(candidates)
+
+
+def bounded_similarity(s1, s2, len1, len2, min_similarity=0.5):
+    """
+    Similarity for strings whose lengths are already known.
+    Returns 0.0 without computing the distance when the length difference
+    alone means the similarity cannot exceed min_similarity.
+    """
+    if not len1 or not len2:
+        return 0.0
+    
+    max_len = max(len1, len2)
+    if abs(len1 - len2) >= max_len * (1.0 - min_similarity):
+        return 0.0
+    
+    return 1.0 - (levenshtein_distance(s1, s2) / max_len)
+
+
+def score_candidates(ocr_name, clean_ocr, candidates):
+    """
+    Score (function, length) candidates against the OCR name (0.0 to 1.0).
+    Uses the best of the original and cleaned OCR names.
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        # One vectorized call scores both queries against all candidates
+        funcs = [func for func, _ in candidates]
+        scores = process.cdist(
+            [ocr_name, clean_ocr], funcs,
+            scorer=Levenshtein.normalized_similarity
+        ).max(axis=0)
+        return list(zip(funcs, scores.tolist()))
+    
+    ocr_len = len(ocr_name)
+    clean_len = len(clean_ocr)
+    return [
+        (func, max(bounded_similarity(ocr_name, func, ocr_len, func_len),
+                   bounded_similarity(clean_ocr, func, clean_len, func_len)))
+        for func, func_len in candidates
+    ]
+
+
+def score_unknown(txt_file, available, length_index, existing):
+    """
+    Score one unknown function info file against the available functions.
+    
+    Returns:
+        None if the file has no OCR name, (ocr_name, None) if it is already
+        corrected, otherwise (ocr_name, top 5 matches) sorted by similarity
+    """
+    # Read the info file
+    with open(txt_file) as f:
+        content = f.read()
+    
+    # Extract OCR name
+    for line in content.split('\n'):
+        if line.startswith('OCR Detected:'):
+            ocr_name = line.split(':', 1)[1].strip().lower()
+            break
+    else:
+        return None
+    
+    if ocr_name in existing:
+        return ocr_name, None
+    
+    # Clean OCR name (remove common prefixes)
+    clean_ocr = ocr_name
+    for prefix in ['def', 'var', 'function', 'func', 'const', 'let']:
+        if clean_ocr.startswith(prefix):
+            clean_ocr = clean_ocr[len(prefix):]
+            break
+    
+    # Find best matches
+    candidates = viable_candidates((ocr_name, clean_ocr), length_index)
+    scores = dict(score_candidates(ocr_name, clean_ocr, candidates))
+    
+    def similarity(func):
+        sim = scores.get(func, 0.0)
+        
+        # Also check if func is substring of ocr or vice versa
+        if func in clean_ocr or clean_ocr in func:
+            sim = max(sim, 0.8)
+        return sim
+    
+    # Keep only the top 5 (bounded heap) instead of sorting every candidate
+    matches = ((func, similarity(func)) for func in available)
+    top = heapq.nlargest(5, (m for m in matches if m[1] > 0.5), key=itemgetter(1))
+    return ocr_name, top
+
+
 def suggest_corrections():
     """Review unknown functions and suggest corrections."""
     history_dir = Path('unknown_snippets_history')
@@ -69,6 +226,7 @@ def suggest_corrections():
     
     # Load available functions
     available = load_available_functions()
+    length_index = build_length_index(available)
     
     # Load existing corrections
     try:
@@ -77,56 +235,31 @@ def suggest_corrections():
     except:
         existing = {}
     
+    # Score files in parallel; rapidfuzz releases the GIL, the pure-Python
+    # fallback needs separate processes to use more than one core
+    executor_class = ThreadPoolExecutor if RAPIDFUZZ_AVAILABLE else ProcessPoolExecutor
+    score = partial(score_unknown, available=available, length_index=length_index, existing=existing)
+    with executor_class(max_workers=min(len(txt_files), os.cpu_count() or 1)) as executor:
+        results = list(executor.map(score, txt_files))
+    
     suggestions = []
     
-    for txt_file in txt_files:
-        # Read the info file
-        with open(txt_file) as f:
-            content = f.read()
-        
-        # Extract OCR name
-        for line in content.split('\n'):
-            if line.startswith('OCR Detected:'):
-                ocr_name = line.split(':', 1)[1].strip().lower()
-                break
-        else:
+    for txt_file, result in zip(txt_files, results):
+        if result is None:
             continue
+        ocr_name, matches = result
         
         # Check if already corrected
-        if ocr_name in existing:
+        if matches is None:
             print(f"✅ Already corrected: {ocr_name} → {existing[ocr_name]}")
             continue
         
-        # Clean OCR name (remove common prefixes)
-        clean_ocr = ocr_name
-        for prefix in ['def', 'var', 'function', 'func', 'const', 'let']:
-            if clean_ocr.startswith(prefix):
-                clean_ocr = clean_ocr[len(prefix):]
-                break
-        
-        # Find best matches
-        matches = []
-        for func in available:
-            # Try both original and cleaned versions
-            sim1 = calculate_similarity(ocr_name, func)
-            sim2 = calculate_similarity(clean_ocr, func)
-            similarity = max(sim1, sim2)
-            
-            # Also check if func is substring of ocr or vice versa
-            if func in clean_ocr or clean_ocr in func:
-                similarity = max(similarity, 0.8)
-            
-            if similarity > 0.5:
-                matches.append((func, similarity))
-        
-        matches.sort(key=lambda x: x[1], reverse=True)
-        
         print(f"❓ Unknown: {ocr_name}")
         print(f"   Screenshot: {txt_file.stem}.png")
         
         if matches:
             print(f"   Top suggestions:")
-            for func, sim in matches[:5]:
+            for func, sim in matches:
                 print(f"     - {func:25} (similarity: {sim:.0%})")
             
             best_match = matches[0][0]
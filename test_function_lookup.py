@@ -3,17 +3,75 @@
 Test function name extraction and database lookup.
 """
 
+import os
 import json
 import re
+from bisect import bisect_right
+from functools import lru_cache
 from PIL import Image, ImageEnhance, ImageFilter
-import pytesseract
 import numpy as np
 
+from wpm_bot import cached_ocr
+
+# Debug images are only written when WPMBOT_DEBUG=1
+DEBUG = os.environ.get('WPMBOT_DEBUG') == '1'
+
+# Try to import orjson for faster parsing of CodeBlocks.json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import OpenCV for a single-buffer preprocessing pipeline
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Try to import rapidfuzz for batch similarity scoring
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Same 3x3 kernel as PIL's ImageFilter.SHARPEN
+SHARPEN_KERNEL = np.array([[-2, -2, -2],
+                           [-2, 32, -2],
+                           [-2, -2, -2]], dtype=np.float32) / 16
+
+# Function definition patterns, compiled once and tried in priority order
+# (same order as FUNCTION_NAME_PATTERNS in wpm_bot.py)
+FUNCTION_NAME_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'var\s+(\w+)\s*=',
+        r'function\s+(\w+)\s*\(',
+        r'def\s+(\w+)\s*\(',
+        r'const\s+(\w+)\s*=',
+        r'let\s+(\w+)\s*=',
+        r'(\w+)\s*=\s*function',
+        r'export\s+function\s+(\w+)',
+    )
+]
+
+# Tesseract config -> loaded tesserocr engine, reused across calls
+OCR_ENGINES = {}
+
+
+@lru_cache(maxsize=1)
+def read_code_blocks_file(path='CodeBlocks.json'):
+    """Parse CodeBlocks.json once per process (with orjson when available)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
 
 def load_code_blocks():
     """Load the code blocks database."""
-    with open('CodeBlocks.json', 'r') as f:
-        blocks = json.load(f)
+    blocks = read_code_blocks_file()
     
     lookup = {}
     for block in blocks:
@@ -29,8 +87,94 @@ def load_code_blocks():
     return lookup
 
 
+def build_title_arrays(code_blocks):
+    """
+    Struct-of-arrays view of the code blocks: parallel titles / variants
+    lists plus a title -> position index, so all titles can be scored in
+    one batch call.
+    """
+    titles = list(code_blocks)
+    variants_by_index = [code_blocks[title] for title in titles]
+    title_index = {title: i for i, title in enumerate(titles)}
+    return titles, variants_by_index, title_index
+
+
+def build_substring_index(titles):
+    """
+    Precompute substring lookup data for the titles:
+    all titles joined with NUL separators (plus each title's start offset),
+    and the set of distinct title lengths.
+    """
+    joined = '\x00'.join(titles)
+    starts = []
+    offset = 0
+    for title in titles:
+        starts.append(offset)
+        offset += len(title) + 1
+    return joined, starts, sorted(set(len(title) for title in titles))
+
+
+def find_substring_match(func_name, title_index, substring_index):
+    """
+    Return the index of the first title that contains func_name or is
+    contained in it, or None.
+    """
+    joined, starts, title_lengths = substring_index
+    candidates = []
+    
+    # Titles containing func_name: first hit in the joined string
+    # (func_name has no NUL, so a hit never spans two titles)
+    pos = joined.find(func_name)
+    if pos != -1:
+        candidates.append(bisect_right(starts, pos) - 1)
+    
+    # Titles contained in func_name: look up its substrings of title lengths
+    for length in title_lengths:
+        if length > len(func_name):
+            break
+        for start in range(len(func_name) - length + 1):
+            index = title_index.get(func_name[start:start + length])
+            if index is not None:
+                candidates.append(index)
+    
+    return min(candidates) if candidates else None
+
+
+def find_fuzzy_match(func_name, titles, title_index, substring_index):
+    """Return the index of the best fuzzy title match, or None."""
+    index = find_substring_match(func_name, title_index, substring_index)
+    if index is not None:
+        return index
+    
+    if RAPIDFUZZ_AVAILABLE:
+        # Score every title in one vectorized call (60% similarity threshold)
+        best = process.extractOne(
+            func_name, titles,
+            scorer=Levenshtein.normalized_similarity, score_cutoff=0.6
+        )
+        if best:
+            return best[2]
+    
+    return None
+
+
 def preprocess_image(img):
-    """Preprocess image for OCR."""
+    """Preprocess image for OCR. Returns a uint8 grayscale ndarray."""
+    if CV2_AVAILABLE:
+        arr = np.asarray(img.convert('L'))
+        
+        # Contrast (2.5x around the mean) + brightness (1.3x) fused into one LUT pass
+        mean = int(arr.mean() + 0.5)
+        levels = np.arange(256, dtype=np.float32)
+        levels = np.clip(mean + (levels - mean) * 2.5, 0, 255)
+        lut = np.clip(levels * 1.3, 0, 255).astype(np.uint8)
+        arr = cv2.LUT(arr, lut)
+        
+        arr = cv2.filter2D(arr, -1, SHARPEN_KERNEL, borderType=cv2.BORDER_REPLICATE)
+        _, arr = cv2.threshold(arr, 100, 255, cv2.THRESH_BINARY)
+        
+        return cv2.resize(arr, (arr.shape[1] * 2, arr.shape[0] * 2), interpolation=cv2.INTER_CUBIC)
+    
     img = img.convert('L')
     enhancer = ImageEnhance.Contrast(img)
     img = enhancer.enhance(2.5)
@@ -40,13 +184,13 @@ def preprocess_image(img):
     
     img_array = np.array(img)
     threshold = 100
-    img_array = np.where(img_array > threshold, 255, 0).astype(np.uint8)
+    np.multiply(img_array > threshold, np.uint8(255), out=img_array)
     img = Image.fromarray(img_array)
     
     new_size = (img.width * 2, img.height * 2)
     img = img.resize(new_size, Image.Resampling.LANCZOS)
     
-    return img
+    return np.asarray(img)
 
 
 def extract_function_name(screenshot_path):
@@ -63,13 +207,15 @@ def extract_function_name(screenshot_path):
     )
     
     title_img = img.crop(title_region)
-    title_img.save("test_function_name_area.png")
+    if DEBUG:
+        title_img.save("test_function_name_area.png")
     
     processed = preprocess_image(title_img)
-    processed.save("test_function_name_processed.png")
+    if DEBUG:
+        Image.fromarray(processed).save("test_function_name_processed.png")
     
     custom_config = r'--oem 3 --psm 6'
-    text = pytesseract.image_to_string(processed, config=custom_config)
+    text = cached_ocr(processed, custom_config, OCR_ENGINES)
     
     print("\n" + "="*60)
     print("OCR TEXT FROM FUNCTION AREA:")
@@ -78,18 +224,8 @@ def extract_function_name(screenshot_path):
     print("="*60)
     
     # Extract function name
-    patterns = [
-        r'var\s+(\w+)\s*=',
-        r'function\s+(\w+)\s*\(',
-        r'def\s+(\w+)\s*\(',
-        r'const\s+(\w+)\s*=',
-        r'let\s+(\w+)\s*=',
-        r'(\w+)\s*=\s*function',
-        r'export\s+function\s+(\w+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in FUNCTION_NAME_PATTERNS:
+        match = pattern.search(text)
         if match:
             func_name = match.group(1)
             print(f"\n✅ Detected function name: {func_name}")
@@ -114,6 +250,8 @@ def main():
     
     # Load database
     code_blocks = load_code_blocks()
+    titles, variants_by_index, title_index = build_title_arrays(code_blocks)
+    substring_index = build_substring_index(titles)
     
     # Extract function name
     func_name = extract_function_name("game_screen.png")
@@ -122,9 +260,18 @@ def main():
         # Look up in database
         print(f"\n🔍 Looking up '{func_name}' in database...")
         
-        if func_name in code_blocks:
-            variants = code_blocks[func_name]
+        index = title_index.get(func_name)
+        if index is not None:
             print(f"✅ EXACT MATCH FOUND!")
+        else:
+            # Try fuzzy match
+            print(f"⚠️  No exact match, trying fuzzy search...")
+            index = find_fuzzy_match(func_name, titles, title_index, substring_index)
+            if index is not None:
+                print(f"✅ FUZZY MATCH: '{func_name}' → '{titles[index]}'")
+        
+        if index is not None:
+            variants = variants_by_index[index]
             print(f"   Available languages: {', '.join(variants.keys())}\n")
             
             # Show all variants
@@ -136,32 +283,15 @@ def main():
                 print("="*60)
                 print()
         else:
-            # Try fuzzy match
-            print(f"⚠️  No exact match, trying fuzzy search...")
-            for key in code_blocks.keys():
-                if func_name in key or key in func_name:
-                    variants = code_blocks[key]
-                    print(f"✅ FUZZY MATCH: '{func_name}' → '{key}'")
-                    print(f"   Available languages: {', '.join(variants.keys())}\n")
-                    
-                    for lang, code in variants.items():
-                        print("="*60)
-                        print(f"CODE FROM DATABASE ({lang.upper()}):")
-                        print("="*60)
-                        print(code)
-                        print("="*60)
-                        print()
-                    break
-            else:
-                print(f"❌ Not found in database")
-                print(f"\nAvailable functions:")
-                for i, key in enumerate(list(code_blocks.keys())[:20]):
-                    variants = code_blocks[key]
-                    print(f"  - {key} ({', '.join(variants.keys())})")
-    
-    print("\n📁 Files created:")
-    print("  - test_function_name_area.png")
-    print("  - test_function_name_processed.png")
+            print(f"❌ Not found in database")
+            print(f"\nAvailable functions:")
+            for key, variants in zip(titles[:20], variants_by_index):
+                print(f"  - {key} ({', '.join(variants.keys())})")
+    
+    if DEBUG:
+        print("\n📁 Files created:")
+        print("  - test_function_name_area.png")
+        print("  - test_function_name_processed.png")
 
 
 if __name__ == "__main__":
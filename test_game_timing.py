@@ -9,71 +9,75 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.options import Options
 
-def test_timing(delay_ms):
-    """Test typing with specific delay."""
+def setup_test_page():
+    """Start Chrome once on a blank textarea page and return (driver, textarea)."""
+    options = Options()
+    options.add_argument("--window-size=1200,800")
+    driver = webdriver.Chrome(options=options)
+    
+    # Navigate to a simple text area
+    driver.get("data:text/html,<html><body><textarea id='test' style='width:100%;height:100%;font-size:18px;font-family:monospace;white-space:pre'></textarea></body></html>")
+    time.sleep(1)
+    
+    # Find the textarea
+    textarea = driver.find_element("id", "test")
+    return driver, textarea
+
+
+def test_timing(delay_ms, driver, textarea):
+    """Test typing with specific delay, reusing an already open driver."""
     print(f"\n{'='*60}")
     print(f"🧪 Testing with {delay_ms}ms delay between characters")
     print('='*60)
     
-    # Setup Chrome
-    options = Options()
-    options.add_argument("--window-size=1200,800")
-    driver = webdriver.Chrome(options=options)
+    textarea.clear()
+    textarea.click()
     
-    try:
-        # Navigate to a simple text area
-        driver.get("data:text/html,<html><body><textarea id='test' style='width:100%;height:100%;font-size:18px;font-family:monospace;white-space:pre'></textarea></body></html>")
-        time.sleep(1)
-        
-        # Find the textarea
-        textarea = driver.find_element("id", "test")
-        textarea.click()
-        
-        # Test text with mixed case and spaces
-        test_text = "def inorderTraversal(root):"
-        
-        print(f"📝 Typing: {repr(test_text)}")
-        
-        start_time = time.time()
-        
-        for char in test_text:
-            actions = ActionChains(driver)
-            
-            if char.isupper():
-                actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT).perform()
-            elif char == ' ':
-                actions.send_keys(Keys.SPACE).perform()
-            else:
-                actions.send_keys(char).perform()
-            
-            time.sleep(delay_ms / 1000.0)
-        
-        elapsed = time.time() - start_time
-        
-        time.sleep(0.5)
-        
-        # Get the actual text
-        actual_text = textarea.get_attribute('value')
-        
-        print(f"\n📊 Results:")
-        print(f"  Expected: {repr(test_text)}")
-        print(f"  Actual:   {repr(actual_text)}")
-        print(f"  Time:     {elapsed:.3f}s")
-        print(f"  WPM:      {(len(test_text) / 5) / (elapsed / 60):.0f}")
-        
-        if actual_text == test_text:
-            print(f"  ✅ PERFECT MATCH!")
-            return True
+    # Test text with mixed case and spaces
+    test_text = "def inorderTraversal(root):"
+    
+    print(f"📝 Typing: {repr(test_text)}")
+    
+    start_time = time.time()
+    
+    # Queue every key with the delay as a browser-side pause,
+    # then send the whole sequence in a single WebDriver call
+    actions = ActionChains(driver)
+    for char in test_text:
+        if char.isupper():
+            actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT)
+        elif char == ' ':
+            actions.send_keys(Keys.SPACE)
         else:
-            print(f"  ❌ MISMATCH")
-            # Show differences
-            for i, (e, a) in enumerate(zip(test_text, actual_text)):
-                if e != a:
-                    print(f"     Position {i}: expected {repr(e)}, got {repr(a)}")
-            return False
+            actions.send_keys(char)
         
-    finally:
-        driver.quit()
+        if delay_ms:
+            actions.pause(delay_ms / 1000.0)
+    actions.perform()
+    
+    elapsed = time.time() - start_time
+    
+    time.sleep(0.5)
+    
+    # Get the actual text
+    actual_text = textarea.get_attribute('value')
+    
+    print(f"\n📊 Results:")
+    print(f"  Expected: {repr(test_text)}")
+    print(f"  Actual:   {repr(actual_text)}")
+    print(f"  Time:     {elapsed:.3f}s")
+    print(f"  WPM:      {(len(test_text) / 5) / (elapsed / 60):.0f}")
+    
+    if actual_text == test_text:
+        print(f"  ✅ PERFECT MATCH!")
+        return True
+    else:
+        print(f"  ❌ MISMATCH")
+        # Show differences
+        for i, (e, a) in enumerate(zip(test_text, actual_text)):
+            if e != a:
+                print(f"     Position {i}: expected {repr(e)}, got {repr(a)}")
+        return False
 
 if __name__ == "__main__":
     print("🎯 Finding optimal typing delay...")
@@ -82,14 +86,20 @@ if __name__ == "__main__":
     # Test different delays
     delays = [0, 1, 2, 5, 10]
     
+    # One browser for all runs; the textarea is cleared between delays
+    driver, textarea = setup_test_page()
+    
     results = {}
-    for delay in delays:
-        try:
-            success = test_timing(delay)
-            results[delay] = success
-        except Exception as e:
-            print(f"❌ Error with {delay}ms: {e}")
-            results[delay] = False
+    try:
+        for delay in delays:
+            try:
+                success = test_timing(delay, driver, textarea)
+                results[delay] = success
+            except Exception as e:
+                print(f"❌ Error with {delay}ms: {e}")
+                results[delay] = False
+    finally:
+        driver.quit()
     
     print("\n" + "="*60)
     print("📊 SUMMARY")
@@ -10,7 +10,7 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.options import Options
 
 def test_line_typing():
-    """Test typing complete lines at once."""
+    """Test typing complete lines at once (CDP Input.insertText per line)."""
     print("🧪 Testing line-by-line typing...")
     
     # Setup Chrome
@@ -47,19 +47,9 @@ def test_line_typing():
             stripped_line = line.lstrip()
             print(f"\nLine {line_idx + 1}: {repr(stripped_line)}")
             
-            # Build action chain for the entire line
-            actions = ActionChains(driver)
-            
-            for char in stripped_line:
-                if char.isupper():
-                    actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT)
-                elif char == ' ':
-                    actions.send_keys(Keys.SPACE)
-                else:
-                    actions.send_keys(char)
-            
-            # Execute all at once
-            actions.perform()
+            # Insert the entire line with one DevTools call
+            if stripped_line:
+                driver.execute_cdp_cmd('Input.insertText', {'text': stripped_line})
             print(f"  ✅ Typed {len(stripped_line)} characters")
             
             # Press Enter (except last line)
@@ -2,16 +2,57 @@
 """
 Test OCR on a screenshot to debug text extraction.
 Usage: python test_ocr.py <screenshot_path>
+Set WPMBOT_DEBUG=1 to also save the intermediate images.
 """
 
+import os
 import sys
 from PIL import Image, ImageEnhance, ImageFilter
-import pytesseract
 import numpy as np
 
+from wpm_bot import cached_ocr, fix_common_ocr_errors
+
+# Debug images are only written when WPMBOT_DEBUG=1
+DEBUG = os.environ.get('WPMBOT_DEBUG') == '1'
+
+# Try to import OpenCV for a single-buffer preprocessing pipeline
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Same 3x3 kernel as PIL's ImageFilter.SHARPEN
+SHARPEN_KERNEL = np.array([[-2, -2, -2],
+                           [-2, 32, -2],
+                           [-2, -2, -2]], dtype=np.float32) / 16
+
+# Tesseract config -> loaded tesserocr engine, reused across calls
+OCR_ENGINES = {}
+
 
 def preprocess_image_for_ocr(img):
-    """Preprocess image to improve OCR accuracy for code."""
+    """
+    Preprocess image to improve OCR accuracy for code.
+    Returns a uint8 grayscale ndarray (what cached_ocr takes).
+    """
+    if CV2_AVAILABLE:
+        # Single OpenCV pipeline on one contiguous uint8 buffer
+        arr = np.asarray(img.convert('L'))
+        
+        # Contrast (2.5x around the mean) + brightness (1.3x) fused into one LUT pass
+        mean = int(arr.mean() + 0.5)
+        levels = np.arange(256, dtype=np.float32)
+        levels = np.clip(mean + (levels - mean) * 2.5, 0, 255)
+        lut = np.clip(levels * 1.3, 0, 255).astype(np.uint8)
+        arr = cv2.LUT(arr, lut)
+        
+        # Sharpen, threshold and scale up 2x
+        arr = cv2.filter2D(arr, -1, SHARPEN_KERNEL, borderType=cv2.BORDER_REPLICATE)
+        _, arr = cv2.threshold(arr, 100, 255, cv2.THRESH_BINARY)
+        
+        return cv2.resize(arr, (arr.shape[1] * 2, arr.shape[0] * 2), interpolation=cv2.INTER_CUBIC)
+    
     # Convert to grayscale
     img = img.convert('L')
     
@@ -31,7 +72,7 @@ def preprocess_image_for_ocr(img):
     
     # Apply threshold to make text pure white on black background
     threshold = 100
-    img_array = np.where(img_array > threshold, 255, 0).astype(np.uint8)
+    np.multiply(img_array > threshold, np.uint8(255), out=img_array)
     
     # Convert back to PIL Image
     img = Image.fromarray(img_array)
@@ -40,68 +81,7 @@ def preprocess_image_for_ocr(img):
     new_size = (img.width * 2, img.height * 2)
     img = img.resize(new_size, Image.Resampling.LANCZOS)
     
-    return img
-
-
-def fix_common_ocr_errors(text):
-    """Fix common OCR mistakes in code."""
-    import re
-    
-    # Fix dot-comma patterns (.,) which should be just dot (.)
-    text = text.replace('.,', '.')
-    
-    # Fix commas that should be dots (common in code)
-    # Pattern: word,word or word,number should be word.word
-    text = re.sub(r'(\w),(\w)', r'\1.\2', text)
-    
-    # Fix semicolons at end of lines (Python doesn't use them)
-    text = re.sub(r';:', ':', text)
-    text = re.sub(r';$', '', text, flags=re.MULTILINE)
-    text = re.sub(r';\s*$', '', text, flags=re.MULTILINE)
-    
-    # Common word replacements
-    replacements = {
-        'aif ': 'if ',
-        ' aif ': ' if ',
-        '\naif ': '\nif ',
-        'le sie:': 'else:',
-        'lelse:': 'else:',
-        'eise:': 'else:',
-        'retum ': 'return ',
-        'retum\n': 'return\n',
-        'whiie ': 'while ',
-        'whlle ': 'while ',
-        'def ': 'def ',
-        'deff ': 'def ',
-        's_f ': 'def ',
-        'ciass ': 'class ',
-        'seif': 'self',
-        'seff': 'self',
-        'Nione': 'None',
-        'Faise': 'False',
-        'Falee': 'False',
-        'True': 'True',
-        'Tme': 'True',
-        'cun.mext': 'cur.next',
-        'cun.': 'cur.',
-        'mext': 'next',
-        'Chead': 'head',
-        'deleteDuplicates(head);': 'deleteDuplicates(head):',
-    }
-    
-    for wrong, right in replacements.items():
-        text = text.replace(wrong, right)
-    
-    # Remove random single letters at start of lines (OCR artifacts)
-    text = re.sub(r'^\s*[a-z]\s+', '', text, flags=re.MULTILINE)
-    
-    # Add missing colons after control structures
-    # if/while/for/elif statements should end with :
-    text = re.sub(r'^(\s*)(if|while|for|elif|else if)\s+(.+?)$', r'\1\2 \3:', text, flags=re.MULTILINE)
-    # Don't double-add colons
-    text = text.replace('::', ':')
-    
-    return text
+    return np.asarray(img)
 
 
 def test_ocr(image_path):
@@ -124,22 +104,25 @@ def test_ocr(image_path):
             int(height * 0.92)
         )
         img = img.crop(code_region)
-        img.save("test_code_area.png")
+        if DEBUG:
+            img.save("test_code_area.png")
         print(f"✅ Cropped to: {img.size}")
     
     # Save original
-    img.save("test_original.png")
+    if DEBUG:
+        img.save("test_original.png")
     
     # Preprocess
     print("\n🔧 Preprocessing image...")
     processed = preprocess_image_for_ocr(img)
-    processed.save("test_processed.png")
-    print("✅ Saved processed image")
+    if DEBUG:
+        Image.fromarray(processed).save("test_processed.png")
+        print("✅ Saved processed image")
     
     # Extract text
     print("\n📝 Extracting text with Tesseract...")
     custom_config = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'
-    text = pytesseract.image_to_string(processed, config=custom_config)
+    text = cached_ocr(processed, custom_config, OCR_ENGINES)
     
     print("\n" + "="*60)
     print("RAW OCR OUTPUT:")
@@ -162,8 +145,9 @@ def test_ocr(image_path):
     print("\n✅ Saved to ocr_output.txt")
     
     print("\n📁 Files created:")
-    print("  - test_original.png (cropped original)")
-    print("  - test_processed.png (preprocessed for OCR)")
+    if DEBUG:
+        print("  - test_original.png (cropped original)")
+        print("  - test_processed.png (preprocessed for OCR)")
     print("  - ocr_output.txt (extracted text)")
 
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test that screenshots saved on the I/O pool match what the bot kept reading.
+"""
+
+import base64
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from wpm_bot import WPMBot, RECENT_SCREENSHOT_COUNT, hash_image
+
+
+class FakeDriver:
+    """Answers Page.captureScreenshot with a new random PNG every call."""
+
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+        self.frames = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == 'Page.captureScreenshot', cmd
+        pixels = self.rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format='PNG')
+        self.frames.append(pixels)
+        return {'data': base64.b64encode(buffer.getvalue()).decode('ascii')}
+
+
+def make_bot():
+    """Build a bot with just what take_screenshot needs (no browser)."""
+    bot = WPMBot.__new__(WPMBot)
+    bot.driver = FakeDriver()
+    bot.last_screenshot = (0.0, None)
+    bot.recent_screenshots = deque(maxlen=RECENT_SCREENSHOT_COUNT)
+    bot.io_pool = ThreadPoolExecutor(max_workers=2)
+    return bot
+
+
+def test_screenshot_roundtrip():
+    """Take, save and read back screenshots while the bot keeps using them."""
+    bot = make_bot()
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = []
+        for i in range(20):
+            filename = os.path.join(tmp, f"shot_{i:02d}.png")
+            img = bot.take_screenshot(filename, ttl=0)
+            # Read the image while its save is still queued
+            hash_image(img)
+            assert np.array_equal(np.asarray(img), bot.driver.frames[-1])
+            saved.append((filename, bot.driver.frames[-1]))
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            count = bot.save_recent_screenshots()
+            # Writes use paths relative to the working directory at save time
+            bot.io_pool.shutdown(wait=True)
+        finally:
+            os.chdir(cwd)
+
+        assert count == RECENT_SCREENSHOT_COUNT
+        for filename, pixels in saved:
+            with Image.open(filename) as img:
+                assert np.array_equal(np.asarray(img), pixels), filename
+        for index, (filename, pixels) in enumerate(saved[-count:]):
+            recent = os.path.join(tmp, f"error_recent_{index:02d}_{os.path.basename(filename)}")
+            with Image.open(recent) as img:
+                assert np.array_equal(np.asarray(img), pixels), recent
+    return len(saved), count
+
+
+if __name__ == "__main__":
+    print("Testing screenshot save/read round trip...")
+    print("=" * 60)
+    shots, recent = test_screenshot_roundtrip()
+    print(f"✅ {shots} screenshots saved and read back intact")
+    print(f"✅ {recent} recent screenshots saved intact")
@@ -33,20 +33,21 @@ def test_space_typing():
         print(f"\n📝 Typing: {repr(test_text)}")
         print("\nCharacter by character:")
         
+        # Build one chain (50ms browser-side pause between keys) and perform once
+        actions = ActionChains(driver)
         for i, char in enumerate(test_text):
-            actions = ActionChains(driver)
-            
             if char.isupper():
                 print(f"  [{i}] {char} (UPPERCASE)")
-                actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT).perform()
+                actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT)
             elif char == ' ':
                 print(f"  [{i}] SPACE (using Keys.SPACE)")
-                actions.send_keys(Keys.SPACE).perform()
+                actions.send_keys(Keys.SPACE)
             else:
                 print(f"  [{i}] {char}")
-                actions.send_keys(char).perform()
+                actions.send_keys(char)
             
-            time.sleep(0.05)
+            actions.pause(0.05)
+        actions.perform()
         
         time.sleep(1)
         
@@ -9,16 +9,27 @@ import sys
 import re
 import json
 import os
+import hashlib
+import base64
+import datetime
+import signal
+import traceback
 from io import BytesIO
+from functools import lru_cache
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
-from PIL import Image
+from PIL import Image, ImageFilter, ImageStat
+import numpy as np
 import pytesseract
 
 # Try to import undetected-chromedriver for better anti-detection
@@ -29,55 +40,639 @@ except ImportError:
     UC_AVAILABLE = False
     print("⚠️  undetected-chromedriver not available, using standard Selenium")
 
+# Try to import rapidfuzz for fast (C++/SIMD) edit distance
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Try to import pyperclip for the 'paste' typing mode
+try:
+    import pyperclip
+    PYPERCLIP_AVAILABLE = True
+except ImportError:
+    PYPERCLIP_AVAILABLE = False
+
+# Try to import tesserocr to keep Tesseract loaded in-process
+# (pytesseract starts a tesseract process and loads the model on every call)
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Set WPMBOT_DEBUG=1 to save step-by-step debug screenshots
+DEBUG = os.environ.get('WPMBOT_DEBUG') == '1'
+
+# Chrome flags shared by both driver backends
+CHROME_ARGUMENTS = [
+    # Window settings
+    "--window-size=1920,1080",
+    "--start-maximized",
+    # Enable WebGL with ANGLE/SwiftShader (software rendering)
+    "--use-gl=angle",
+    "--use-angle=swiftshader",
+    "--enable-webgl",
+]
+
+# Resources the bot never needs, blocked when block_resources is enabled.
+# Images and fonts are drawn on the canvas and must load for OCR to work.
+BLOCKED_URL_PATTERNS = ["*.mp3", "*.ogg", "*.wav", "*.m4a"]
+
+# Patterns for the function name in OCR text, tried in order
+# Look for patterns like: "var functionName", "function functionName", "def functionName"
+FUNCTION_NAME_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'var\s+(\w+)\s*=',           # var functionName =
+    r'function\s+(\w+)\s*\(',     # function functionName(
+    r'def\s+(\w+)\s*\(',          # def functionName(
+    r'const\s+(\w+)\s*=',         # const functionName =
+    r'let\s+(\w+)\s*=',           # let functionName =
+    r'(\w+)\s*=\s*function',      # functionName = function
+    r'export\s+function\s+(\w+)', # export function functionName
+)]
+
+# camelCase or snake_case words, for guessing a name when no pattern matches
+IDENTIFIER_RE = re.compile(r'\b[a-z][a-zA-Z0-9_]+\b')
+
+# Common keywords that are never the function name
+KEYWORDS = frozenset({'var', 'let', 'const', 'function', 'def', 'class', 'return', 'if', 'else', 'for', 'while'})
+
+# Common OCR word mistakes in code
+OCR_REPLACEMENTS = {
+    'aif ': 'if ',
+    ' aif ': ' if ',
+    '\naif ': '\nif ',
+    'le sie:': 'else:',
+    'lelse:': 'else:',
+    'eise:': 'else:',
+    'retum ': 'return ',
+    'retum\n': 'return\n',
+    'whiie ': 'while ',
+    'whlle ': 'while ',
+    'def ': 'def ',
+    'deff ': 'def ',
+    's_f ': 'def ',
+    'ciass ': 'class ',
+    'seif': 'self',
+    'seff': 'self',
+    'Nione': 'None',
+    'Faise': 'False',
+    'Falee': 'False',
+    'True': 'True',
+    'Tme': 'True',
+    'cun.mext': 'cur.next',
+    'cun.': 'cur.',
+    'mext': 'next',
+    'Chead': 'head',
+    'deleteDuplicates(head);': 'deleteDuplicates(head):',
+}
+
+# Variant to use when the selected language has none (javascript first,
+# matching detect_language_from_screen's default)
+LANGUAGE_PREFERENCE = ('javascript', 'python', 'golang', 'react')
+
+# Binarization table for Image.point: pixels above 100 become white.
+# Adjust threshold based on your screen - code text appears to be lighter
+OCR_THRESHOLD = 100
+THRESHOLD_LUT = [0] * (OCR_THRESHOLD + 1) + [255] * (255 - OCR_THRESHOLD)
+
+# OCR'd names at least this similar to the previous challenge's name are
+# treated as the same function (a 1-character flip in an 8-letter name is 0.875)
+SAME_FUNCTION_SIMILARITY = 0.85
+
+# Substring fallback index granularity (see build_substring_index)
+SUBSTRING_GRAM = 3
+
+# Full screenshots younger than this (seconds) are reused instead of recaptured
+SCREENSHOT_TTL = 0.1
+
+# Modifier held with 'v' to paste in the 'paste' typing mode
+PASTE_MODIFIER = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+
+# Screenshots kept in memory and written to disk only if the run fails
+RECENT_SCREENSHOT_COUNT = 10
+
+# Page.captureScreenshot parameters: PNG (lossless, for OCR) with Chrome's
+# faster, lower-compression encoder since the bytes never leave the machine
+SCREENSHOT_PARAMS = {'format': 'png', 'optimizeForSpeed': True}
+
+# Function name area (fractions of the viewport): skips the sidebar on the
+# left and only covers the first few lines, where the signature is drawn.
+# It changes between challenges, so it is also watched for transitions
+TITLE_REGION = (0.20, 0.08, 0.70, 0.20)
+SCREEN_REGION = (0.0, 0.0, 1.0, 1.0)
+
+# Headings that only appear on the results screen (no word boundaries: OCR
+# often glues them to the numbers, e.g. '85WPM')
+RESULTS_RE = re.compile(r'WPM|ACCURACY', re.IGNORECASE)
+
+# Language names looked for on screen, in priority order ('go' alone also
+# counts as golang); matched case-insensitively, without lowercasing the text
+LANGUAGE_PATTERNS = (
+    ('javascript', re.compile(r'javascript', re.IGNORECASE)),
+    ('python', re.compile(r'python', re.IGNORECASE)),
+    ('golang', re.compile(r'go', re.IGNORECASE)),
+    ('react', re.compile(r'react', re.IGNORECASE)),
+)
+
+# Game content area next to the sidebar (code, results), and the longest side
+# it is reduced to for the results check, which only looks for headings
+CONTENT_REGION = (0.20, 0.08, 0.95, 0.92)
+OCR_MAX_SIDE = 1024
+
+# Screen change polling: captures are downscaled since they are only hashed
+PIXEL_POLL_INTERVAL = 0.05
+SIGNATURE_SCALE = 0.25
+
+# How long a changed region must stay still before the new screen counts as
+# drawn (a single poll can land between the last keystroke's echo and the
+# transition itself)
+SCREEN_SETTLE_HOLD = 0.25
+
+# Upper bound on waiting for the next challenge after typing or skipping;
+# the wait normally ends as soon as the function name area changes
+CHALLENGE_TRANSITION_TIMEOUT = 4
+
+# Screen captures carry no resolution metadata: tell Tesseract to treat them
+# as 300 DPI (what it is tuned for) instead of upscaling the images first
+OCR_DPI_CONFIG = '--dpi 300'
+
+# Tesseract config for the function name area: LSTM engine only (--oem 1),
+# block of text (the crop spans the first few lines, so not --psm 7), and
+# only the characters the function name patterns need
+TITLE_OCR_CONFIG = (
+    f'--oem 1 --psm 6 {OCR_DPI_CONFIG} -c tessedit_char_whitelist='
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_()=.,'
+)
+
+# Tesseract config for full-screen text (results check): default engine,
+# single uniform block of text
+SCREEN_OCR_CONFIG = f'--oem 3 --psm 6 {OCR_DPI_CONFIG}'
+
+# Number of OCR results kept in memory, keyed by a hash of the cropped pixels
+OCR_CACHE_SIZE = 256
+
+# Number of database lookups kept in memory, keyed by OCR'd function name
+CODE_CACHE_SIZE = 512
+
+
+def key_tokens(line):
+    """
+    Translate a line into (key, shifted) tokens.
+    Uppercase letters become their lowercase key pressed with shift and
+    spaces become Keys.SPACE.
+    """
+    return tuple(
+        (char.lower(), True) if char.isupper() else (Keys.SPACE if char == ' ' else char, False)
+        for char in line
+    )
+
+
+@lru_cache(maxsize=512)
+def typing_plan(text):
+    """
+    Precompute how type_text sends a text: one (stripped_line, key tokens)
+    pair per line. Leading indentation is dropped because the game
+    auto-indents. Database snippets are planned when CodeBlocks.json is
+    loaded, so typing them does no per-character work up front.
+    """
+    return tuple((line.lstrip(), key_tokens(line.lstrip())) for line in text.split('\n'))
+
+
+# DevTools Input.dispatchKeyEvent fields for keys that aren't letters/digits
+CDP_SPECIAL_KEYS = {
+    ' ': {'code': 'Space', 'windowsVirtualKeyCode': 32},
+    '\n': {'key': 'Enter', 'code': 'Enter', 'windowsVirtualKeyCode': 13, 'text': '\r'},
+}
+CDP_SHIFT_MODIFIER = 8
+
+
+@lru_cache(maxsize=256)
+def cdp_key_events(char):
+    """
+    Build the (keyDown, keyUp) Input.dispatchKeyEvent payloads for one character.
+    Uppercase letters carry the shift modifier, like a real shifted key press.
+    """
+    key = {'key': char, 'text': char}
+    if char.isalpha() and char.isascii():
+        key.update(code=f"Key{char.upper()}", windowsVirtualKeyCode=ord(char.upper()))
+        if char.isupper():
+            key['modifiers'] = CDP_SHIFT_MODIFIER
+    elif char.isdigit():
+        key.update(code=f"Digit{char}", windowsVirtualKeyCode=ord(char))
+    key.update(CDP_SPECIAL_KEYS.get(char, {}))
+    
+    key_up = {k: v for k, v in key.items() if k != 'text'}
+    return {'type': 'keyDown', **key}, {'type': 'keyUp', **key_up}
+
+
+@lru_cache(maxsize=1)
+def read_code_blocks(path, mtime):
+    """
+    Parse CodeBlocks.json into a {title: {language: code}} lookup.
+    Cached per (path, mtime), so repeated loads skip the JSON decode.
+    
+    Returns:
+        (number of code blocks, lookup)
+    """
+    with open(path, 'r') as f:
+        blocks = json.load(f)
+    
+    # Create lookup dictionary by title (case-insensitive)
+    # Store all language variants
+    lookup = {}
+    for block in blocks:
+        title = block['title'].lower()
+        language = block.get('language', 'unknown')
+        # Join all block lines into single string
+        code = ''.join(block['blocks'])
+        
+        # Store by title only (will prefer based on language detection)
+        if title not in lookup:
+            lookup[title] = {}
+        lookup[title][language] = code
+        
+        # Build the key sequence now rather than when it's typed
+        typing_plan(code)
+    
+    return len(blocks), lookup
+
+
+@lru_cache(maxsize=1)
+def read_ocr_corrections(path, mtime):
+    """Load the OCR corrections map, cached per (path, mtime)."""
+    with open(path, 'r') as f:
+        return json.load(f).get('corrections', {})
+
+
+def parse_tesseract_config(config):
+    """
+    Split a pytesseract config string ('--oem 1 --psm 6 --dpi 300 -c name=value')
+    into (oem, psm, {variable: value}); oem/psm are None when not given.
+    """
+    oem = psm = None
+    variables = {}
+    tokens = iter(config.split())
+    for flag in tokens:
+        value = next(tokens, '')
+        if flag == '--oem':
+            oem = int(value)
+        elif flag == '--psm':
+            psm = int(value)
+        elif flag == '--dpi':
+            variables['user_defined_dpi'] = value
+        elif flag == '-c':
+            name, _, value = value.partition('=')
+            variables[name] = value
+    return oem, psm, variables
+
+
+def create_ocr_engine(config):
+    """Create a tesserocr engine set up like pytesseract would be with config."""
+    oem, psm, variables = parse_tesseract_config(config)
+    engine = tesserocr.PyTessBaseAPI(
+        psm=tesserocr.PSM.AUTO if psm is None else psm,
+        oem=tesserocr.OEM.DEFAULT if oem is None else oem,
+    )
+    for name, value in variables.items():
+        engine.SetVariable(name, value)
+    return engine
+
+
+def ocr_image(img, config, engines):
+    """
+    Run Tesseract on a PIL image with a pytesseract-style config string.
+    With tesserocr, one engine per config is kept loaded in engines.
+    """
+    if not TESSEROCR_AVAILABLE:
+        return pytesseract.image_to_string(img, config=config)
+    
+    engine = engines.get(config)
+    if engine is None:
+        engine = engines[config] = create_ocr_engine(config)
+    engine.SetImage(img)
+    return engine.GetUTF8Text()
+
+
+def fix_common_ocr_errors(text):
+    """Fix common OCR mistakes in code."""
+    # Fix dot-comma patterns (.,) which should be just dot (.)
+    text = text.replace('.,', '.')
+    
+    # Fix commas that should be dots (common in code)
+    # Pattern: word,word or word,number should be word.word
+    text = re.sub(r'(\w),(\w)', r'\1.\2', text)
+    
+    # Fix semicolons at end of lines (Python doesn't use them)
+    text = re.sub(r';:', ':', text)
+    text = re.sub(r';$', '', text, flags=re.MULTILINE)
+    text = re.sub(r';\s*$', '', text, flags=re.MULTILINE)
+    
+    # Common word replacements
+    for wrong, right in OCR_REPLACEMENTS.items():
+        text = text.replace(wrong, right)
+    
+    # Remove random single letters at start of lines (OCR artifacts)
+    text = re.sub(r'^\s*[a-z]\s+', '', text, flags=re.MULTILINE)
+    
+    # Add missing colons after control structures
+    # if/while/for/elif statements should end with :
+    text = re.sub(r'^(\s*)(if|while|for|elif|else if)\s+(.+?)$', r'\1\2 \3:', text, flags=re.MULTILINE)
+    # Don't double-add colons
+    text = text.replace('::', ':')
+    
+    return text
+
+
+# Tesseract results shared across runs by the test scripts, keyed by pixels
+OCR_CACHE_FILE = 'ocr_cache.json'
+
+
+def cached_ocr(img_array, config, engines):
+    """
+    Run Tesseract on a preprocessed image, reusing results for identical images.
+    Results are stored in OCR_CACHE_FILE keyed by a blake2b hash of the pixels.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(config.encode())
+    digest.update(str(img_array.shape).encode())
+    digest.update(img_array.tobytes())
+    key = digest.hexdigest()
+    
+    try:
+        with open(OCR_CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+    
+    if key in cache:
+        print("⚡ OCR cache hit")
+        return cache[key]
+    
+    text = ocr_image(Image.fromarray(img_array), config, engines)
+    cache[key] = text
+    with open(OCR_CACHE_FILE, 'w') as f:
+        json.dump(cache, f, indent=2)
+    return text
+
+
+def region_box(size, region):
+    """Pixel crop box for a region given as fractions of an image size."""
+    width, height = size
+    left, top, right, bottom = region
+    return (int(left * width), int(top * height), int(right * width), int(bottom * height))
+
+
+def decode_screenshot(data):
+    """
+    Decode a base64 DevTools screenshot into a fully loaded PIL Image.
+    Image.open is lazy; loading here means the image can be cached, hashed
+    and saved from other threads without sharing an open file pointer.
+    """
+    img = Image.open(BytesIO(base64.b64decode(data)))
+    img.load()
+    return img
+
+
+def hash_image(img):
+    """Short digest of a PIL image's pixels, used as an OCR cache key."""
+    return hashlib.blake2b(img.tobytes(), digest_size=16).digest()
+
+
+@lru_cache(maxsize=256)
+def contrast_brightness_lut(mean, contrast=2.5, brightness=1.3):
+    """
+    256-entry Image.point table equivalent to ImageEnhance.Contrast(contrast) followed by
+    ImageEnhance.Brightness(brightness) on an 'L' image with the given mean
+    (same float32 math, truncation and clipping as PIL's blend).
+    """
+    levels = np.arange(256, dtype=np.float32)
+    levels = np.clip(np.trunc(np.float32(mean) + (levels - np.float32(mean)) * np.float32(contrast)), 0, 255)
+    levels = np.clip(np.trunc(levels * np.float32(brightness)), 0, 255)
+    return levels.astype(np.uint8).tolist()
+
+
+@lru_cache(maxsize=8192)
+def levenshtein_distance(s1, s2):
+    """Calculate Levenshtein (edit) distance between two strings (memoized)."""
+    if RAPIDFUZZ_AVAILABLE:
+        return Levenshtein.distance(s1, s2)
+    
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    
+    if len(s2) == 0:
+        return len(s1)
+    
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+    
+    return previous_row[-1]
+
+
+def calculate_similarity(s1, s2):
+    """Calculate similarity between two strings (0.0 to 1.0)."""
+    if not s1 or not s2:
+        return 0.0
+    
+    if RAPIDFUZZ_AVAILABLE:
+        return Levenshtein.normalized_similarity(s1, s2)
+    
+    distance = levenshtein_distance(s1, s2)
+    max_len = max(len(s1), len(s2))
+    
+    # Convert distance to similarity
+    similarity = 1.0 - (distance / max_len)
+    return similarity
+
+
+def is_same_function(name, previous):
+    """
+    Whether two OCR'd function names are the same function, allowing for a
+    flipped character or so of OCR noise between frames.
+    """
+    if not name or not previous:
+        return False
+    return name == previous or calculate_similarity(name, previous) >= SAME_FUNCTION_SIMILARITY
+
+
+def build_substring_index(names):
+    """
+    Index function names for find_substring_match.
+    
+    Returns:
+        (3-gram -> positions of the names containing it,
+         first 3 characters -> positions of the names starting with them,
+         positions of names too short to index)
+    """
+    grams = {}
+    prefixes = {}
+    short = []
+    for position, name in enumerate(names):
+        if len(name) < SUBSTRING_GRAM:
+            short.append(position)
+            continue
+        prefixes.setdefault(name[:SUBSTRING_GRAM], []).append(position)
+        for i in range(len(name) - SUBSTRING_GRAM + 1):
+            grams.setdefault(name[i:i + SUBSTRING_GRAM], set()).add(position)
+    return grams, prefixes, tuple(short)
+
+
+def find_substring_match(query, names, index):
+    """
+    First name (in database order) that contains query or is contained in it.
+    Same result as scanning every name, but only compares names that start
+    with one of the query's 3-grams or contain its first 3-gram.
+    """
+    grams, prefixes, short = index
+    if len(query) < SUBSTRING_GRAM:
+        # Too short to look up, scan everything
+        candidates = range(len(names))
+    else:
+        candidates = set(short)
+        candidates.update(grams.get(query[:SUBSTRING_GRAM], ()))
+        for i in range(len(query) - SUBSTRING_GRAM + 1):
+            candidates.update(prefixes.get(query[i:i + SUBSTRING_GRAM], ()))
+        candidates = sorted(candidates)
+    
+    for position in candidates:
+        name = names[position]
+        if query in name or name in query:
+            return name
+    return None
+
+
+@lru_cache(maxsize=1024)
+def fuzzy_match(ocr_lower, function_names):
+    """
+    Find the function name closest to a lowercased OCR name (memoized).
+    
+    Returns:
+        (best_match, similarity), or (None, 0) if nothing scores above 60%
+    """
+    # Clean OCR name (remove common prefixes that OCR adds)
+    clean_ocr = ocr_lower
+    for prefix in ['def', 'var', 'function', 'func', 'const', 'let']:
+        if clean_ocr.startswith(prefix):
+            clean_ocr = clean_ocr[len(prefix):]
+            break
+    
+    # Calculate similarity with all function names, trying both the
+    # original and cleaned versions
+    if RAPIDFUZZ_AVAILABLE:
+        # One vectorized call scores both queries against every name
+        similarities = process.cdist(
+            [ocr_lower, clean_ocr], function_names,
+            scorer=Levenshtein.normalized_similarity, dtype='float64'
+        ).max(axis=0).tolist()
+    else:
+        similarities = [
+            max(calculate_similarity(ocr_lower, func_name), calculate_similarity(clean_ocr, func_name))
+            for func_name in function_names
+        ]
+    
+    best_match = None
+    best_score = 0
+    
+    for func_name, similarity in zip(function_names, similarities):
+        # Boost score if substring match
+        if func_name in clean_ocr or clean_ocr in func_name:
+            similarity = max(similarity, 0.85)
+        
+        if similarity > best_score and similarity > 0.6:  # 60% threshold
+            best_score = similarity
+            best_match = func_name
+    
+    return best_match, best_score
+
 
 class WPMBot:
-    def __init__(self, typing_speed=1, use_undetected=True):
+    # Supported typing modes:
+    #   keys   - one ActionChains key press per character (default, most reliable)
+    #   chain  - one ActionChains for the whole snippet, paced with browser-side pauses
+    #   cdp    - DevTools Input.dispatchKeyEvent per key (no W3C actions overhead)
+    #   insert - one DevTools Input.insertText call per line
+    #   paste  - pyperclip.copy + Ctrl+V per line (falls back to insert without pyperclip)
+    TYPING_MODES = ('keys', 'chain', 'cdp', 'insert', 'paste')
+    
+    def __init__(self, typing_speed=1, use_undetected=True, typing_mode='keys', block_resources=False, debug=DEBUG):
         """
         Initialize the WPM Bot.
         
         Args:
             typing_speed: Delay between each character (lower = faster)
             use_undetected: Use undetected-chromedriver if available
+            typing_mode: How keystrokes are sent, one of TYPING_MODES
+            block_resources: Block BLOCKED_URL_PATTERNS (audio) to speed up page load
+            debug: Save step-by-step screenshots (defaults to WPMBOT_DEBUG=1)
         """
+        if typing_mode not in self.TYPING_MODES:
+            raise ValueError(f"Unknown typing mode: {typing_mode} (expected one of {', '.join(self.TYPING_MODES)})")
+        if typing_mode == 'paste' and not PYPERCLIP_AVAILABLE:
+            print("⚠️  pyperclip not available, using 'insert' typing mode instead of 'paste'")
+            typing_mode = 'insert'
+        
         self.typing_speed = typing_speed
+        self.typing_mode = typing_mode
+        # Resolve the per-line sender once so type_text doesn't branch on the
+        # mode for every line ('chain' sends the whole snippet at once instead,
+        # and so does 'keys' when there is no delay to wait between keys)
+        self.send_line = getattr(self, f"send_line_{typing_mode}", None)
+        if typing_mode == 'keys' and typing_speed <= 0:
+            self.send_line = None
+        self.block_resources = block_resources
+        self.debug = debug
         self.driver = None
         self.use_undetected = use_undetected and UC_AVAILABLE
+        
+        # Resolve/download chromedriver in the background (network bound)
+        # while the database loads; setup_driver picks up the result
+        self.driver_path_future = None
+        if not self.use_undetected:
+            executor = ThreadPoolExecutor(max_workers=1)
+            self.driver_path_future = executor.submit(ChromeDriverManager().install)
+            executor.shutdown(wait=False)
+        
         self.code_blocks = self.load_code_blocks()
+        self.function_names = tuple(self.code_blocks)  # Hashable, for the fuzzy match cache
+        self.substring_index = build_substring_index(self.function_names)
         self.selected_language = None  # Track the language selected in game menu
         self.unknown_count = 0  # Counter for unknown function screenshots
+        self.ocr_cache = OrderedDict()  # (region, pixel hash) -> OCR text, LRU order
+        self.code_cache = OrderedDict()  # (function name, language, hint) -> code, LRU order
+        self.ocr_engines = {}  # Tesseract config -> loaded tesserocr engine
+        self.viewport = None  # (width, height, device pixel ratio), read once
+        self.last_title_img = None  # Most recent function name crop
+        self.last_screenshot = (0.0, None)  # (monotonic time, PIL Image)
+        self.recent_screenshots = deque(maxlen=RECENT_SCREENSHOT_COUNT)  # (filename, PIL Image)
+        
+        # Screenshot PNGs are encoded/written on background threads so OCR
+        # doesn't wait on disk
+        self.io_pool = ThreadPoolExecutor(max_workers=2)
         
         # Create unknown_snippets_history directory
-        import os
         os.makedirs('unknown_snippets_history', exist_ok=True)
         
     def load_code_blocks(self):
         """Load the code blocks database from JSON file."""
         try:
-            with open('CodeBlocks.json', 'r') as f:
-                blocks = json.load(f)
-            print(f"✅ Loaded {len(blocks)} code blocks from database")
-            
-            # Create lookup dictionary by title (case-insensitive)
-            # Store all language variants
-            lookup = {}
-            for block in blocks:
-                title = block['title'].lower()
-                language = block.get('language', 'unknown')
-                # Join all block lines into single string
-                code = ''.join(block['blocks'])
-                
-                # Store by title only (will prefer based on language detection)
-                if title not in lookup:
-                    lookup[title] = {}
-                lookup[title][language] = code
-                
-            print(f"   Functions: {len(lookup)} unique, {len(blocks)} total (with language variants)")
+            # Parsed once per file version; editing the file busts the cache
+            block_count, lookup = read_code_blocks('CodeBlocks.json', os.path.getmtime('CodeBlocks.json'))
+            print(f"✅ Loaded {block_count} code blocks from database")
+            print(f"   Functions: {len(lookup)} unique, {block_count} total (with language variants)")
             
             # Load OCR corrections map
             try:
-                with open('ocr_corrections.json', 'r') as f:
-                    corrections_data = json.load(f)
-                    self.ocr_corrections = corrections_data.get('corrections', {})
+                self.ocr_corrections = read_ocr_corrections('ocr_corrections.json', os.path.getmtime('ocr_corrections.json'))
                 print(f"   Loaded {len(self.ocr_corrections)} OCR corrections")
             except FileNotFoundError:
                 print("   ⚠️  ocr_corrections.json not found, using fuzzy matching only")
@@ -97,12 +692,8 @@ class WPMBot:
         if self.use_undetected:
             print("🛡️  Using undetected-chromedriver...")
             options = uc.ChromeOptions()
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--start-maximized")
-            # Enable WebGL with ANGLE/SwiftShader
-            options.add_argument("--use-gl=angle")
-            options.add_argument("--use-angle=swiftshader")
-            options.add_argument("--enable-webgl")
+            for argument in CHROME_ARGUMENTS:
+                options.add_argument(argument)
             
             self.driver = uc.Chrome(options=options, version_main=None)
         else:
@@ -114,32 +705,85 @@ class WPMBot:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
-            # Window settings
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--start-maximized")
-            
-            # Enable WebGL with ANGLE/SwiftShader (software rendering)
-            chrome_options.add_argument("--use-gl=angle")
-            chrome_options.add_argument("--use-angle=swiftshader")
-            chrome_options.add_argument("--enable-webgl")
+            for argument in CHROME_ARGUMENTS:
+                chrome_options.add_argument(argument)
             chrome_options.add_argument("--no-sandbox")
             
-            service = Service(ChromeDriverManager().install())
+            service = Service(self.driver_path_future.result())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             
-            # Remove webdriver property
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            # Remove webdriver property on every page load (an execute_script
+            # here would only patch the blank start page)
+            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            })
+        
+        if self.block_resources:
+            # Skip downloading audio the bot never plays
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            print(f"🚫 Blocking {', '.join(BLOCKED_URL_PATTERNS)}")
         
-        self.driver.implicitly_wait(5)
         print("✅ WebDriver initialized")
         
+        self.warm_up_ocr()
+        
+    def warm_up_ocr(self):
+        """Load the OCR engines before the game starts, so the first challenge isn't cold."""
+        if not TESSEROCR_AVAILABLE:
+            return
+        blank = Image.new('L', (256, 64), 255)
+        for config in (TITLE_OCR_CONFIG, SCREEN_OCR_CONFIG):
+            self.ocr_text(blank, config)
+        print("✅ OCR engines loaded")
+        
+    def ocr_text(self, img, config=OCR_DPI_CONFIG):
+        """
+        Run Tesseract on an image with a pytesseract-style config string.
+        With tesserocr, one engine per config stays loaded for the whole run.
+        """
+        return ocr_image(img, config, self.ocr_engines)
+        
+    def evaluate(self, expression):
+        """
+        Evaluate a JavaScript expression in the page via DevTools and return its value.
+        Cheaper than execute_script for simple probes (no W3C script wrapper).
+        """
+        response = self.driver.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+        })
+        return response.get('result', {}).get('value')
+        
     def navigate_to_game(self):
         """Navigate to the WPM game website."""
         print("🌐 Navigating to wpm.silver.dev...")
         self.driver.get("https://wpm.silver.dev")
-        time.sleep(3)  # Wait for WebGL canvas to initialize
+        
+        # Wait for the game canvas and a fully loaded document instead of a fixed sleep
+        try:
+            wait = WebDriverWait(self.driver, 15)
+            wait.until(EC.presence_of_element_located((By.TAG_NAME, "canvas")))
+            wait.until(lambda d: self.evaluate("document.readyState") == "complete")
+        except TimeoutException:
+            print("⚠️  Game canvas not ready after 15s, continuing anyway")
         print("✅ Page loaded")
         
+    def press_enter(self):
+        """Press Enter, using raw DevTools key events in the 'cdp'/'insert' modes."""
+        if self.typing_mode in ('cdp', 'insert'):
+            for event in cdp_key_events('\n'):
+                self.driver.execute_cdp_cmd('Input.dispatchKeyEvent', event)
+        else:
+            ActionChains(self.driver).send_keys(Keys.ENTER).perform()
+        
+    def queue_key(self, actions, key, shifted=False):
+        """Queue a single key token (see key_tokens) on an ActionChains and return it."""
+        if shifted:
+            # For uppercase, hold shift and press the lowercase letter
+            return actions.key_down(Keys.SHIFT).send_keys(key).key_up(Keys.SHIFT)
+        return actions.send_keys(key)
+        
     def type_text(self, text):
         """
         Type text character by character with proper delays.
@@ -149,156 +793,288 @@ class WPMBot:
         Uses 100ms (0.1s) delay between characters to give the game's
         canvas event handler enough time to process each keystroke.
         Faster delays cause keys to be queued/merged by the game.
+        The delay is a schedule rather than a fixed sleep: key i is due at
+        start + i * typing_speed, so time already spent in the WebDriver
+        round-trip counts towards the delay.
+        
+        In 'chain' mode the whole snippet, Enter keys included, is queued on
+        one ActionChains with pause(typing_speed) between keys and sent in a
+        single perform(), so the pacing happens in the browser. In 'cdp'
+        mode each key is sent as DevTools keyDown/keyUp events, skipping the
+        W3C actions layer. In 'insert' mode each line is sent with a single
+        DevTools Input.insertText call instead of one WebDriver round-trip
+        per key. 'paste' copies each line to the clipboard and sends Ctrl+V
+        (Cmd+V on macOS), falling back to 'insert' for a line when the
+        clipboard can't be used. A typing_speed of 0 sends everything
+        without pacing; in 'keys' mode that means a single unpaused chain.
         """
-        from selenium.webdriver.common.action_chains import ActionChains
+        lines = typing_plan(text)
+        self.invalidate_screenshot()
+        
+        # Bind names used on every keystroke to locals once
+        typing_speed = self.typing_speed
+        perf_counter = time.perf_counter
+        sleep = time.sleep
+        
+        # One ActionChains for the whole call: perform() sends and then
+        # empties the queued actions, so it can be reused for every key
+        actions = ActionChains(self.driver)
+        
+        start = perf_counter()
+        keystrokes = 0
+        
+        def pace():
+            # Sleep only for whatever is left until the next key is due
+            nonlocal keystrokes
+            keystrokes += 1
+            remaining = start + keystrokes * typing_speed - perf_counter()
+            if remaining > 0:
+                sleep(remaining)
+        
+        if typing_speed <= 0:
+            # Unpaced: send keys back-to-back and let Chrome's input queue
+            # absorb them (only safe in modes that don't need per-key gaps)
+            def pace():
+                pass
         
-        lines = text.split('\n')
+        if self.send_line is None:
+            self.send_lines_chained(actions, lines)
+            return
         
-        for line_idx, line in enumerate(lines):
-            # Skip leading whitespace (indentation) - game auto-indents
-            # But preserve the actual code content
-            stripped_line = line.lstrip()
-
+        send_line = self.send_line
+        last_line = len(lines) - 1
+        for line_idx, (stripped_line, tokens) in enumerate(lines):
+            # Leading whitespace (indentation) is already stripped - game auto-indents
+            # But the actual code content is preserved
             print(f"Typing line: -->{stripped_line}<--")
             
-            if not stripped_line:
-                # Empty line, just press Enter
-                if line_idx < len(lines) - 1:
-                    ActionChains(self.driver).send_keys(Keys.ENTER).perform()
-                    time.sleep(self.typing_speed)
-                continue
-            
-            # Type each character individually with minimal delay
-            # This prevents the game from receiving too many events at once
-            for char in stripped_line:
-                actions = ActionChains(self.driver)
-                
-                if char.isupper():
-                    # For uppercase, hold shift and press the lowercase letter
-                    actions.key_down(Keys.SHIFT).send_keys(char.lower()).key_up(Keys.SHIFT).perform()
-                elif char == ' ':
-                    # Use Keys.SPACE for spaces
-                    actions.send_keys(Keys.SPACE).perform()
-                else:
-                    actions.send_keys(char).perform()
-                
-                # Delay to let game process the key event
-                # Game's canvas event handler needs time to process each key
-                time.sleep(self.typing_speed)  # Use configured typing speed
+            # Empty lines only need the Enter below
+            if stripped_line:
+                send_line(actions, stripped_line, tokens, pace)
             
             # Press Enter to go to next line (except for last line)
+            if line_idx < last_line:
+                self.press_enter()
+                pace()
+            
+    def send_lines_chained(self, actions, lines):
+        """
+        'chain' mode (and unpaced 'keys'): queue every line and the Enter
+        keys, then send them in one perform().
+        """
+        queue_key = self.queue_key
+        typing_speed = self.typing_speed
+        
+        # Queueing sends nothing, so the prints don't delay any keys
+        for line_idx, (stripped_line, tokens) in enumerate(lines):
+            print(f"Typing line: -->{stripped_line}<--")
+            for key, shifted in tokens:
+                queue_key(actions, key, shifted)
+                if typing_speed > 0:
+                    actions.pause(typing_speed)
             if line_idx < len(lines) - 1:
-                ActionChains(self.driver).send_keys(Keys.ENTER).perform()
-                time.sleep(self.typing_speed)
-            
-    def take_screenshot(self, filename="screenshot.png"):
-        """Take a screenshot and return as PIL Image."""
-        screenshot = self.driver.get_screenshot_as_png()
-        img = Image.open(BytesIO(screenshot))
-        img.save(filename)
+                actions.send_keys(Keys.ENTER)
+                if typing_speed > 0:
+                    actions.pause(typing_speed)
+        actions.perform()
+        
+    def send_line_keys(self, actions, line, tokens, pace):
+        """'keys' mode: one WebDriver actions call per key."""
+        queue_key = self.queue_key
+        
+        # Type each character individually with minimal delay
+        # This prevents the game from receiving too many events at once
+        for key, shifted in tokens:
+            queue_key(actions, key, shifted).perform()
+            
+            # Delay to let game process the key event
+            # Game's canvas event handler needs time to process each key
+            pace()
+        
+    def send_line_cdp(self, actions, line, tokens, pace):
+        """'cdp' mode: DevTools keyDown/keyUp events per key."""
+        execute_cdp_cmd = self.driver.execute_cdp_cmd
+        for char in line:
+            key_down, key_up = cdp_key_events(char)
+            execute_cdp_cmd('Input.dispatchKeyEvent', key_down)
+            execute_cdp_cmd('Input.dispatchKeyEvent', key_up)
+            pace()
+        
+    def send_line_insert(self, actions, line, tokens, pace):
+        """'insert' mode: the whole line in one call; no per-key events to pace."""
+        self.driver.execute_cdp_cmd('Input.insertText', {'text': line})
+        pace()
+        
+    def send_line_paste(self, actions, line, tokens, pace):
+        """'paste' mode: clipboard + Ctrl+V, or insertText without a clipboard."""
+        try:
+            pyperclip.copy(line)
+            actions.key_down(PASTE_MODIFIER).send_keys('v').key_up(PASTE_MODIFIER).perform()
+        except pyperclip.PyperclipException:
+            # No clipboard (e.g. headless Linux without xclip)
+            self.driver.execute_cdp_cmd('Input.insertText', {'text': line})
+        pace()
+        
+    def take_screenshot(self, filename=None, ttl=SCREENSHOT_TTL):
+        """
+        Take a screenshot and return as PIL Image, saving it only if a filename is given.
+        Captured in memory through DevTools (see SCREENSHOT_PARAMS).
+        A screenshot taken less than ttl seconds ago is reused; anything that
+        changes the screen (typing, key presses) invalidates it.
+        """
+        taken_at, img = self.last_screenshot
+        if img is None or time.monotonic() - taken_at >= ttl:
+            result = self.driver.execute_cdp_cmd('Page.captureScreenshot', SCREENSHOT_PARAMS)
+            img = decode_screenshot(result['data'])
+            self.last_screenshot = (time.monotonic(), img)
+            self.recent_screenshots.append((filename or "screen.png", img))
+        if filename:
+            self.save_in_background(img, filename)
         return img
         
-    def extract_text_from_screenshot(self, img=None, region=None):
-        """Extract text from screenshot using OCR."""
+    def save_recent_screenshots(self):
+        """Write the screenshots kept in memory to disk, oldest first."""
+        for index, (filename, img) in enumerate(self.recent_screenshots):
+            name = os.path.basename(filename)
+            self.save_in_background(img, f"error_recent_{index:02d}_{name}")
+        return len(self.recent_screenshots)
+        
+    def invalidate_screenshot(self):
+        """Forget the cached screenshot after the screen was changed."""
+        self.last_screenshot = (0.0, None)
+        
+    def save_in_background(self, img, filename):
+        """
+        Write an image to disk on the I/O pool without blocking the caller.
+        The worker saves its own copy, so the caller can keep reading img.
+        """
+        self.io_pool.submit(img.copy().save, filename)
+        
+    def debug_screenshot(self, filename):
+        """Save a screenshot only in debug mode (PNG encoding is not free)."""
+        if self.debug:
+            self.take_screenshot(filename)
+        
+    def capture_region(self, left, top, right, bottom, scale=1.0):
+        """
+        Capture part of the viewport as a PIL Image with a clipped DevTools
+        screenshot. Bounds are fractions of the viewport, like a crop box.
+        Chrome only encodes the clipped pixels instead of the full screen.
+        scale < 1 captures a downscaled image.
+        """
+        if self.viewport is None:
+            self.viewport = tuple(self.evaluate("[window.innerWidth, window.innerHeight, window.devicePixelRatio]"))
+        width, height, pixel_ratio = self.viewport
+        
+        clip = {
+            'x': left * width,
+            'y': top * height,
+            'width': (right - left) * width,
+            'height': (bottom - top) * height,
+            'scale': pixel_ratio * scale,
+        }
+        result = self.driver.execute_cdp_cmd('Page.captureScreenshot', {**SCREENSHOT_PARAMS, 'clip': clip})
+        return decode_screenshot(result['data'])
+        
+    def extract_text_from_screenshot(self, img=None, region=None, max_side=None):
+        """
+        Extract text from screenshot using OCR.
+        
+        Args:
+            region: Optional area to OCR, as fractions of the image (like TITLE_REGION)
+            max_side: Optional longest side in pixels; larger crops are reduced first
+        """
         if img is None:
             img = self.take_screenshot()
             
-        # Crop to specific region if provided (x, y, width, height)
+        # OCR cost grows with the pixel count: crop, then shrink if asked
         if region:
-            img = img.crop(region)
+            img = img.crop(region_box(img.size, region))
+        if max_side and max(img.size) > max_side:
+            img = img.reduce(-(-max(img.size) // max_side))
             
-        # Use Tesseract to extract text
-        # PSM 6 = Assume a single uniform block of text
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(img, config=custom_config)
-        return text.strip()
+        # Same pixels as an earlier call (e.g. the screen didn't change while
+        # checking for results): reuse the text instead of running OCR again
+        cache_key = ('screen', hash_image(img))
+        text = self.ocr_cache_get(cache_key)
+        if text is not None:
+            return text
+        
+        # Use Tesseract to extract text (see SCREEN_OCR_CONFIG)
+        text = self.ocr_text(img, SCREEN_OCR_CONFIG).strip()
+        self.ocr_cache_put(cache_key, text)
+        return text
         
     def preprocess_image_for_ocr(self, img):
         """Preprocess image to improve OCR accuracy for code."""
-        from PIL import ImageEnhance, ImageFilter
-        import numpy as np
-        
         # Convert to grayscale
         img = img.convert('L')
         
-        # Increase contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(2.5)
-        
-        # Increase brightness slightly
-        enhancer = ImageEnhance.Brightness(img)
-        img = enhancer.enhance(1.3)
+        # Increase contrast and brightness slightly, as one lookup table pass
+        mean = int(ImageStat.Stat(img).mean[0] + 0.5)
+        img = img.point(contrast_brightness_lut(mean))
         
         # Sharpen
         img = img.filter(ImageFilter.SHARPEN)
         
-        # Convert to numpy array for thresholding
-        img_array = np.array(img)
-        
         # Apply threshold to make text pure white on black background
-        # Adjust threshold based on your screen - code text appears to be lighter
-        threshold = 100
-        img_array = np.where(img_array > threshold, 255, 0).astype(np.uint8)
+        img = img.point(THRESHOLD_LUT)
         
-        # Convert back to PIL Image
-        img = Image.fromarray(img_array)
+        # No upscaling: the OCR configs pass the resolution (OCR_DPI_CONFIG)
+        return img
         
-        # Scale up 2x for better OCR
-        new_size = (img.width * 2, img.height * 2)
-        img = img.resize(new_size, Image.Resampling.LANCZOS)
+    def ocr_cache_get(self, key):
+        """Return cached OCR text for key (None on a miss), marking it recently used."""
+        text = self.ocr_cache.get(key)
+        if text is not None:
+            self.ocr_cache.move_to_end(key)
+        return text
         
-        return img
+    def ocr_cache_put(self, key, text):
+        """Cache OCR text for key, evicting the least recently used entry when full."""
+        self.ocr_cache[key] = text
+        if len(self.ocr_cache) > OCR_CACHE_SIZE:
+            self.ocr_cache.popitem(last=False)
         
-    def extract_function_name(self):
+    def extract_function_name(self, title_img=None):
         """
         Extract just the function name from the screen using OCR.
         Much more reliable than extracting entire code.
-        """
-        img = self.take_screenshot("game_screen.png")
         
-        # Get image dimensions
-        width, height = img.size
+        Args:
+            title_img: Already captured TITLE_REGION image (captured here if None)
+        """
+        if self.debug:
+            self.take_screenshot("game_screen.png")
         
         # Focus on the top area where function name appears
-        # Function name is usually in the first few lines
-        title_region = (
-            int(width * 0.20),   # x: 20% from left (skip sidebar)
-            int(height * 0.08),  # y: 8% from top
-            int(width * 0.70),   # width: to 70% (function name area)
-            int(height * 0.20)   # height: just top 20% (first few lines)
-        )
-        
-        # Crop and save for debugging
-        title_img = img.crop(title_region)
-        title_img.save("function_name_area.png")
-        
-        # Preprocess for better OCR
-        processed_img = self.preprocess_image_for_ocr(title_img)
-        processed_img.save("function_name_processed.png")
-        
-        # Extract text
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(processed_img, config=custom_config)
+        # Only this region is captured, not the full screen.
+        if title_img is None:
+            title_img = self.capture_region(*TITLE_REGION)
+        
+        # Keep for the unknown-function history, save for debugging
+        self.last_title_img = title_img
+        if self.debug:
+            self.save_in_background(title_img, "function_name_area.png")
+        
+        # Same pixels as a previous challenge: skip preprocessing and OCR
+        cache_key = ('title', hash_image(title_img))
+        text = self.ocr_cache_get(cache_key)
+        if text is None:
+            # Preprocess for better OCR
+            processed_img = self.preprocess_image_for_ocr(title_img)
+            if self.debug:
+                self.save_in_background(processed_img, "function_name_processed.png")
+            
+            # Extract text
+            text = self.ocr_text(processed_img, TITLE_OCR_CONFIG)
+            self.ocr_cache_put(cache_key, text)
         
         print(f"📝 OCR extracted text:\n{text[:200]}")
         
-        # Extract function name from text
-        # Look for patterns like: "var functionName", "function functionName", "def functionName"
-        import re
-        
-        # Try different patterns
-        patterns = [
-            r'var\s+(\w+)\s*=',           # var functionName =
-            r'function\s+(\w+)\s*\(',     # function functionName(
-            r'def\s+(\w+)\s*\(',          # def functionName(
-            r'const\s+(\w+)\s*=',         # const functionName =
-            r'let\s+(\w+)\s*=',           # let functionName =
-            r'(\w+)\s*=\s*function',      # functionName = function
-            r'export\s+function\s+(\w+)', # export function functionName
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # Extract function name from text, trying each pattern in order
+        for pattern in FUNCTION_NAME_PATTERNS:
+            match = pattern.search(text)
             if match:
                 func_name = match.group(1)
                 print(f"✅ Detected function name: {func_name}")
@@ -306,15 +1082,12 @@ class WPMBot:
         
         # If no pattern matches, try to find any word that looks like a function name
         # Look for camelCase or snake_case words
-        words = re.findall(r'\b[a-z][a-zA-Z0-9_]+\b', text)
-        if words:
-            # Filter out common keywords
-            keywords = {'var', 'let', 'const', 'function', 'def', 'class', 'return', 'if', 'else', 'for', 'while'}
-            candidates = [w for w in words if w.lower() not in keywords and len(w) > 3]
-            if candidates:
-                func_name = candidates[0]
-                print(f"🔍 Best guess function name: {func_name}")
-                return func_name.lower()
+        # First word that isn't a common keyword; stops at the first hit
+        words = (match.group() for match in IDENTIFIER_RE.finditer(text))
+        func_name = next((w for w in words if len(w) > 3 and w.lower() not in KEYWORDS), None)
+        if func_name:
+            print(f"🔍 Best guess function name: {func_name}")
+            return func_name.lower()
         
         print("⚠️  Could not detect function name from OCR")
         return None
@@ -326,32 +1099,26 @@ class WPMBot:
         """
         # Take a screenshot and look for language hints
         try:
-            img = self.take_screenshot("lang_detect.png")
+            img = self.take_screenshot()
             width, height = img.size
             
             # Check top area for language indicators
             top_region = (0, 0, width, int(height * 0.15))
             top_img = img.crop(top_region)
             
-            # Simple OCR to detect language
-            text = pytesseract.image_to_string(top_img).lower()
+            # Simple OCR to detect language (cached on the cropped pixels)
+            cache_key = ('language', hash_image(top_img))
+            text = self.ocr_cache_get(cache_key)
+            if text is None:
+                text = self.ocr_text(top_img)
+                self.ocr_cache_put(cache_key, text)
             
             # Look for language keywords in the code itself
             # JavaScript: var, let, const, function
             # Python: def, import
             # Go: func, package
-            
-            if 'javascript' in text:
-                return 'javascript'
-            elif 'python' in text:
-                return 'python'
-            elif 'golang' in text or 'go' in text:
-                return 'golang'
-            elif 'react' in text:
-                return 'react'
-                
             # Default to javascript (most common)
-            return 'javascript'
+            return next((language for language, pattern in LANGUAGE_PATTERNS if pattern.search(text)), 'javascript')
         except:
             return 'javascript'
     
@@ -371,30 +1138,8 @@ class WPMBot:
             print(f"🔧 OCR correction: '{ocr_name}' → '{corrected}'")
             return corrected
         
-        # Clean OCR name (remove common prefixes that OCR adds)
-        clean_ocr = ocr_lower
-        for prefix in ['def', 'var', 'function', 'func', 'const', 'let']:
-            if clean_ocr.startswith(prefix):
-                clean_ocr = clean_ocr[len(prefix):]
-                break
-        
-        # Calculate similarity with all function names
-        best_match = None
-        best_score = 0
-        
-        for func_name in self.code_blocks.keys():
-            # Try both original and cleaned versions
-            sim1 = self.calculate_similarity(ocr_lower, func_name)
-            sim2 = self.calculate_similarity(clean_ocr, func_name)
-            similarity = max(sim1, sim2)
-            
-            # Boost score if substring match
-            if func_name in clean_ocr or clean_ocr in func_name:
-                similarity = max(similarity, 0.85)
-            
-            if similarity > best_score and similarity > 0.6:  # 60% threshold
-                best_score = similarity
-                best_match = func_name
+        # Repeated OCR outputs are answered from the cache
+        best_match, best_score = fuzzy_match(ocr_lower, self.function_names)
         
         if best_match:
             print(f"🔍 Fuzzy match: '{ocr_name}' → '{best_match}' (similarity: {best_score:.2%})")
@@ -402,41 +1147,11 @@ class WPMBot:
         
         return None
     
-    def levenshtein_distance(self, s1, s2):
-        """Calculate Levenshtein (edit) distance between two strings."""
-        if len(s1) < len(s2):
-            return self.levenshtein_distance(s2, s1)
-        
-        if len(s2) == 0:
-            return len(s1)
-        
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-        
-        return previous_row[-1]
-    
-    def calculate_similarity(self, s1, s2):
-        """Calculate similarity between two strings (0.0 to 1.0)."""
-        if not s1 or not s2:
-            return 0.0
-        
-        distance = self.levenshtein_distance(s1, s2)
-        max_len = max(len(s1), len(s2))
-        
-        # Convert distance to similarity
-        similarity = 1.0 - (distance / max_len)
-        return similarity
-    
     def get_code_from_database(self, function_name, language_hint=None):
         """
         Look up the exact code from the database by function name.
+        Found snippets are cached per (name, selected language, hint), so a
+        repeated name skips the fuzzy/substring matching.
         
         Args:
             function_name: The name of the function (case-insensitive)
@@ -447,7 +1162,29 @@ class WPMBot:
         """
         if not function_name:
             return None
-            
+        
+        func_name_lower = function_name.lower()
+        cache_key = (func_name_lower, self.selected_language, language_hint)
+        code = self.code_cache.get(cache_key)
+        if code is not None:
+            self.code_cache.move_to_end(cache_key)
+            print(f"✅ Using cached code for '{function_name}'")
+            return code
+        
+        code = self.lookup_code(function_name, language_hint)
+        
+        # Only cache names that look like identifiers, so garbled OCR doesn't
+        # evict real entries. Without a selected language the variant comes
+        # from the screen, so it isn't cached either.
+        if (code is not None and self.selected_language
+                and len(func_name_lower) >= 3 and IDENTIFIER_RE.fullmatch(func_name_lower)):
+            self.code_cache[cache_key] = code
+            if len(self.code_cache) > CODE_CACHE_SIZE:
+                self.code_cache.popitem(last=False)
+        return code
+        
+    def lookup_code(self, function_name, language_hint=None):
+        """Uncached get_code_from_database: exact, corrected, then substring match."""
         func_name_lower = function_name.lower()
         
         # Try exact match first
@@ -464,14 +1201,16 @@ class WPMBot:
                 print(f"✅ Found '{function_name}' for language: {language_hint}")
                 return variants[language_hint]
             
-            # Priority 3: Detect language from screen
-            detected_lang = self.detect_language_from_screen()
-            if detected_lang in variants:
-                print(f"✅ Found '{function_name}' (detected language: {detected_lang})")
-                return variants[detected_lang]
+            # Priority 3: Detect language from screen (an extra screenshot + OCR,
+            # so only when no language was selected in the menu)
+            if not self.selected_language:
+                detected_lang = self.detect_language_from_screen()
+                if detected_lang in variants:
+                    print(f"✅ Found '{function_name}' (detected language: {detected_lang})")
+                    return variants[detected_lang]
             
-            # Priority 4: Fall back to first available variant
-            first_lang = list(variants.keys())[0]
+            # Priority 4: Fall back to the preferred available variant
+            first_lang = next((lang for lang in LANGUAGE_PREFERENCE if lang in variants), next(iter(variants)))
             print(f"✅ Found '{function_name}' (using {first_lang} variant)")
             return variants[first_lang]
         
@@ -491,12 +1230,12 @@ class WPMBot:
             return variants[first_lang]
         
         # Try substring match as last resort
-        for key in self.code_blocks.keys():
-            if func_name_lower in key or key in func_name_lower:
-                variants = self.code_blocks[key]
-                first_lang = list(variants.keys())[0]
-                print(f"✅ Found substring match: '{function_name}' → '{key}' ({first_lang})")
-                return variants[first_lang]
+        key = find_substring_match(func_name_lower, self.function_names, self.substring_index)
+        if key:
+            variants = self.code_blocks[key]
+            first_lang = list(variants.keys())[0]
+            print(f"✅ Found substring match: '{function_name}' → '{key}' ({first_lang})")
+            return variants[first_lang]
         
         # Not found - save screenshot for analysis
         print(f"❌ Function '{function_name}' not found in database")
@@ -507,24 +1246,19 @@ class WPMBot:
     def save_unknown_function_screenshot(self, function_name):
         """Save screenshot of unknown function to history folder."""
         try:
-            import datetime
-            import shutil
-            
             self.unknown_count += 1
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             
-            # Save game screen
-            src_file = "game_screen.png"
-            if os.path.exists(src_file):
-                dest_file = f"unknown_snippets_history/{timestamp}_{self.unknown_count:03d}_{function_name}.png"
-                shutil.copy(src_file, dest_file)
-                print(f"📸 Saved unknown function screenshot: {dest_file}")
+            # Save game screen (the unknown function is still showing)
+            dest_file = f"unknown_snippets_history/{timestamp}_{self.unknown_count:03d}_{function_name}.png"
+            self.take_screenshot(dest_file)
+            print(f"📸 Saved unknown function screenshot: {dest_file}")
             
-            # Also save the processed function name area
-            src_file = "function_name_processed.png"
-            if os.path.exists(src_file):
+            # Also save the processed function name area (kept in memory,
+            # re-preprocessed here since this path is rare)
+            if self.last_title_img is not None:
                 dest_file = f"unknown_snippets_history/{timestamp}_{self.unknown_count:03d}_{function_name}_processed.png"
-                shutil.copy(src_file, dest_file)
+                self.save_in_background(self.preprocess_image_for_ocr(self.last_title_img), dest_file)
             
             # Save a text file with OCR info
             info_file = f"unknown_snippets_history/{timestamp}_{self.unknown_count:03d}_{function_name}.txt"
@@ -587,77 +1321,92 @@ class WPMBot:
         processed_img.save("code_area_processed.png")
         
         # Extract text with optimized config for code
-        custom_config = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'
-        text = pytesseract.image_to_string(processed_img, config=custom_config)
+        custom_config = f'--oem 3 --psm 6 {OCR_DPI_CONFIG} -c preserve_interword_spaces=1'
+        text = self.ocr_text(processed_img, custom_config)
         
         # Post-process common OCR errors in code
-        text = self.fix_common_ocr_errors(text)
+        text = fix_common_ocr_errors(text)
         
         return text.strip()
         
-    def fix_common_ocr_errors(self, text):
-        """Fix common OCR mistakes in code."""
-        import re
-        
-        # Fix dot-comma patterns (.,) which should be just dot (.)
-        text = text.replace('.,', '.')
-        
-        # Fix commas that should be dots (common in code)
-        # Pattern: word,word or word,number should be word.word
-        text = re.sub(r'(\w),(\w)', r'\1.\2', text)
-        
-        # Fix semicolons at end of lines (Python doesn't use them)
-        text = re.sub(r';:', ':', text)
-        text = re.sub(r';$', '', text, flags=re.MULTILINE)
-        text = re.sub(r';\s*$', '', text, flags=re.MULTILINE)
-        
-        # Common word replacements
-        replacements = {
-            'aif ': 'if ',
-            ' aif ': ' if ',
-            '\naif ': '\nif ',
-            'le sie:': 'else:',
-            'lelse:': 'else:',
-            'eise:': 'else:',
-            'retum ': 'return ',
-            'retum\n': 'return\n',
-            'whiie ': 'while ',
-            'whlle ': 'while ',
-            'def ': 'def ',
-            'deff ': 'def ',
-            's_f ': 'def ',
-            'ciass ': 'class ',
-            'seif': 'self',
-            'seff': 'self',
-            'Nione': 'None',
-            'Faise': 'False',
-            'Falee': 'False',
-            'True': 'True',
-            'Tme': 'True',
-            'cun.mext': 'cur.next',
-            'cun.': 'cur.',
-            'mext': 'next',
-            'Chead': 'head',
-            'deleteDuplicates(head);': 'deleteDuplicates(head):',
-        }
+    def region_signature(self, region=SCREEN_REGION):
+        """Hash of a small, downscaled capture of region."""
+        return hash_image(self.capture_region(*region, scale=SIGNATURE_SCALE))
         
-        for wrong, right in replacements.items():
-            text = text.replace(wrong, right)
+    def wait_for_pixel_change(self, region=SCREEN_REGION, timeout=3, poll=PIXEL_POLL_INTERVAL, since=None,
+                              hold=SCREEN_SETTLE_HOLD):
+        """
+        Wait for the pixels in region to change and settle, instead of
+        sleeping for a fixed time.
         
-        # Remove random single letters at start of lines (OCR artifacts)
-        text = re.sub(r'^\s*[a-z]\s+', '', text, flags=re.MULTILINE)
+        Args:
+            since: Signature taken before the action that changes the screen
+                (defaults to what is on screen now)
+            hold: Seconds the region must stay unchanged after changing
         
-        # Add missing colons after control structures
-        # if/while/for/elif statements should end with :
-        text = re.sub(r'^(\s*)(if|while|for|elif|else if)\s+(.+?)$', r'\1\2 \3:', text, flags=re.MULTILINE)
-        # Don't double-add colons
-        text = text.replace('::', ':')
+        Returns:
+            Seconds waited; the full timeout when nothing changed
+        """
+        start = time.perf_counter()
+        previous = since if since is not None else self.region_signature(region)
+        changed_at = None
+        
+        def settled(driver):
+            nonlocal previous, changed_at
+            current = self.region_signature(region)
+            now = time.perf_counter()
+            if current != previous:
+                changed_at = now
+                previous = current
+                return False
+            # Changed, then held still for hold seconds: the new screen is up
+            return changed_at is not None and now - changed_at >= hold
+        
+        # The game exposes no state to script, so the pixels are the signal
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=poll).until(settled)
+        except TimeoutException:
+            pass
         
-        return text
+        self.invalidate_screenshot()
+        return time.perf_counter() - start
         
-    def wait_for_screen_change(self, timeout=3):
-        """Wait a bit for the screen to update."""
-        time.sleep(timeout)
+    def wait_for_pixel_stable(self, region=SCREEN_REGION, timeout=3, hold=0.5, poll=PIXEL_POLL_INTERVAL):
+        """
+        Wait until region has looked the same for hold seconds (the screen
+        finished drawing), up to timeout. Returns the seconds waited.
+        """
+        start = time.perf_counter()
+        previous = None
+        unchanged_since = None
+        
+        def stable(driver):
+            nonlocal previous, unchanged_since
+            current = self.region_signature(region)
+            now = time.perf_counter()
+            if current != previous:
+                previous = current
+                unchanged_since = now
+                return False
+            return now - unchanged_since >= hold
+        
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=poll).until(stable)
+        except TimeoutException:
+            pass
+        
+        self.invalidate_screenshot()
+        return time.perf_counter() - start
+        
+    def enter_menu_option(self, text, timeout):
+        """Type a menu option, press Enter and wait for the next screen."""
+        self.type_text(text)
+        # Let the option finish echoing, so only Enter can change the baseline
+        self.wait_for_pixel_stable(timeout=1, hold=SCREEN_SETTLE_HOLD)
+        before = self.region_signature()
+        self.type_text("\n")
+        elapsed = self.wait_for_pixel_change(timeout=timeout, since=before)
+        print(f"   ⏱️  Next screen after {elapsed:.2f}s")
         
     def start_game_sequence(self, language='python', mode='interview'):
         """
@@ -671,38 +1420,33 @@ class WPMBot:
         print("🎮 STARTING GAME SEQUENCE")
         print("="*60)
         
+        # New game, new screens: drop OCR results from the previous run
+        self.ocr_cache.clear()
+        
         # Step 1: Start screen - type 'start'
         print("\n📝 Step 1: Typing 'start'...")
-        time.sleep(2)
-        self.take_screenshot("01_initial.png")
-        self.type_text("start")
-        self.type_text("\n")
-        self.wait_for_screen_change(2)
+        self.wait_for_pixel_change(timeout=2)
+        self.debug_screenshot("01_initial.png")
+        self.enter_menu_option("start", 2)
         
         # Step 2: Audio option - type 'no'
         print("📝 Step 2: Audio option - typing 'no'...")
-        self.take_screenshot("02_audio.png")
-        self.type_text("no")
-        self.type_text("\n")
-        self.wait_for_screen_change(2)
+        self.debug_screenshot("02_audio.png")
+        self.enter_menu_option("no", 2)
         
         # Step 3: Language selection
         print(f"📝 Step 3: Language - typing '{language}'...")
-        self.take_screenshot("03_language.png")
+        self.debug_screenshot("03_language.png")
         self.selected_language = language  # Remember the language we selected
-        self.type_text(language)
-        self.type_text("\n")
-        self.wait_for_screen_change(2)
+        self.enter_menu_option(language, 2)
         
         # Step 4: Mode selection
         print(f"📝 Step 4: Mode - typing '{mode}'...")
-        self.take_screenshot("04_mode.png")
-        self.type_text(mode)
-        self.type_text("\n")
-        self.wait_for_screen_change(3)
+        self.debug_screenshot("04_mode.png")
+        self.enter_menu_option(mode, 3)
         
         print("✅ Game sequence complete! Game should be starting...")
-        self.take_screenshot("05_game_start.png")
+        self.debug_screenshot("05_game_start.png")
         
     def play_typing_challenge(self):
         """
@@ -719,25 +1463,43 @@ class WPMBot:
         max_challenges = 10  # Safety limit
         
         prev_function_name = None
+        prev_title_hash = None
+        
+        # Wait for code to appear
+        self.wait_for_pixel_change(TITLE_REGION, timeout=2)
         
         while challenge_count < max_challenges:
             challenge_count += 1
             print(f"\n🔄 Challenge {challenge_count}")
+            self.invalidate_screenshot()
             
-            # Wait for code to appear
-            time.sleep(2)
+            # Identical function name pixels to the settled frame after
+            # typing mean no transition yet: no need to OCR them to find out
+            title_img = self.capture_region(*TITLE_REGION)
+            title_hash = hash_image(title_img)
+            if title_hash == prev_title_hash:
+                print("⚠️  Function name area unchanged, waiting longer...")
+                self.wait_for_pixel_change(TITLE_REGION, timeout=3)
+                title_img = self.capture_region(*TITLE_REGION)
+                title_hash = hash_image(title_img)
+                
+                if title_hash == prev_title_hash:
+                    print("⚠️  Still same function, game may have ended")
+                    break
             
             # Take screenshot and extract function name first
             print("📸 Taking screenshot...")
-            current_function = self.extract_function_name()
+            current_function = self.extract_function_name(title_img)
             
             # Check if it's the same as previous (avoid re-typing)
-            if current_function and current_function == prev_function_name:
+            if is_same_function(current_function, prev_function_name):
                 print(f"⚠️  Same function as previous ({current_function}), waiting longer...")
-                time.sleep(3)
-                current_function = self.extract_function_name()
+                self.wait_for_pixel_change(TITLE_REGION, timeout=3)
+                title_img = self.capture_region(*TITLE_REGION)
+                title_hash = hash_image(title_img)
+                current_function = self.extract_function_name(title_img)
                 
-                if current_function == prev_function_name:
+                if is_same_function(current_function, prev_function_name):
                     print("⚠️  Still same function, game may have ended")
                     break
             
@@ -747,17 +1509,20 @@ class WPMBot:
             if not code_text or len(code_text) < 10:
                 print("⚠️  No code detected or game may have ended")
                 # Check if we see results screen
-                img = self.take_screenshot(f"challenge_{challenge_count}_check.png")
-                full_text = self.extract_text_from_screenshot(img)
-                if "WPM" in full_text.upper() or "ACCURACY" in full_text.upper():
+                img = self.take_screenshot(f"challenge_{challenge_count}_check.png" if self.debug else None)
+                full_text = self.extract_text_from_screenshot(img, region=CONTENT_REGION, max_side=OCR_MAX_SIDE)
+                if RESULTS_RE.search(full_text):
                     print("🏁 Game ended - results screen detected!")
                     break
                 
                 # Skip this challenge - press ESC to go to next
                 print("⏭️  Skipping challenge (pressing ESC)...")
-                from selenium.webdriver.common.action_chains import ActionChains
+                title_before = self.region_signature(TITLE_REGION)
                 ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                time.sleep(2)
+                # Skipping redraws right away, so poll more often than after typing
+                elapsed = self.wait_for_pixel_change(TITLE_REGION, timeout=CHALLENGE_TRANSITION_TIMEOUT,
+                                                     poll=PIXEL_POLL_INTERVAL / 2, since=title_before)
+                print(f"   ⏱️  Next challenge after {elapsed:.2f}s")
                 continue
             
             print("\n" + "-"*60)
@@ -769,6 +1534,10 @@ class WPMBot:
             # Type the code
             print(f"⌨️  Typing {len(code_text)} characters...")
             self.type_text(code_text)
+            # Baseline once the last keystrokes are drawn, so typing itself
+            # doesn't count as the transition
+            self.wait_for_pixel_stable(TITLE_REGION, timeout=1, hold=SCREEN_SETTLE_HOLD)
+            title_before = self.region_signature(TITLE_REGION)
 
             # OLD: Type character by character
             # char_count = 0
@@ -779,12 +1548,16 @@ class WPMBot:
             #         print(f"   Progress: {char_count}/{len(code_text)}")
             # print(f"✅ Typed {char_count} characters")
             
-            # Remember this function to avoid re-typing
+            # Remember this function (and how its name area looks once
+            # typed) to avoid re-typing
             prev_function_name = current_function
+            prev_title_hash = hash_image(self.capture_region(*TITLE_REGION))
             
             # Wait for game to process and move to next challenge
+            # (the function name area changes when it does)
             print("⏳ Waiting for next challenge...")
-            time.sleep(2)  # Give game more time to transition
+            elapsed = self.wait_for_pixel_change(TITLE_REGION, timeout=CHALLENGE_TRANSITION_TIMEOUT, since=title_before)
+            print(f"   ⏱️  Next challenge after {elapsed:.2f}s")
             
         print("\n🏁 Typing loop finished")
         
@@ -794,7 +1567,9 @@ class WPMBot:
         print("📊 CAPTURING RESULTS")
         print("="*60)
         
-        time.sleep(3)
+        # Wait for the results screen to finish drawing instead of a fixed 3s
+        elapsed = self.wait_for_pixel_stable(timeout=3)
+        print(f"⏱️  Results screen settled after {elapsed:.2f}s")
         img = self.take_screenshot("final_results.png")
         results_text = self.extract_text_from_screenshot(img)
         
@@ -829,8 +1604,7 @@ class WPMBot:
             
             # Keep browser open to see results
             try:
-                while True:
-                    time.sleep(1)
+                wait_for_interrupt()
             except KeyboardInterrupt:
                 pass
                 
@@ -838,25 +1612,46 @@ class WPMBot:
             print("\n⚠️  Bot interrupted by user")
         except Exception as e:
             print(f"\n❌ Error: {e}")
-            import traceback
             traceback.print_exc()
             
-            # Take error screenshot
+            # Take error screenshot, plus the ones leading up to the error
             try:
-                self.take_screenshot("error_screenshot.png")
+                saved = self.save_recent_screenshots()
+                if saved:
+                    print(f"📸 Saved {saved} recent screenshot(s) as error_recent_*.png")
+                # Fresh capture, so the cached frame isn't queued for a second save
+                self.take_screenshot("error_screenshot.png", ttl=0)
                 print("📸 Error screenshot saved")
             except:
                 pass
         finally:
+            # Let pending screenshot writes finish
+            self.io_pool.shutdown(wait=True)
+            
+            for engine in self.ocr_engines.values():
+                engine.End()
+            
             if self.driver:
                 print("\n🔒 Closing browser...")
                 self.driver.quit()
 
 
+def wait_for_interrupt():
+    """Block until Ctrl+C, sleeping in the kernel instead of waking up every second."""
+    if hasattr(signal, 'pause'):
+        while True:
+            signal.pause()
+    
+    # Windows has no signal.pause, and blocking waits there ignore Ctrl+C
+    while True:
+        time.sleep(1)
+
+
 def main():
     # Typing speed: delay between characters above 0.005, and 0.01 is recommended
     typing_speed = 0.01  # 10ms default for reliable canvas event handling
     language = 'python'  # Default language
+    typing_mode = 'keys'  # Paced key events; the canvas drops unpaced keys
     
     # Parse command line arguments
     if len(sys.argv) > 1:
@@ -869,11 +1664,19 @@ def main():
         language = sys.argv[2].lower()
         print(f"🌐 Language: {language}")
     
+    if len(sys.argv) > 3:
+        if sys.argv[3].lower() in WPMBot.TYPING_MODES:
+            typing_mode = sys.argv[3].lower()
+        else:
+            print(f"Invalid typing mode: {sys.argv[3]}, using default {typing_mode} "
+                  f"(options: {', '.join(WPMBot.TYPING_MODES)})")
+    
     print(f"⚡ Typing speed: {typing_speed}s per character")
-    print(f"💡 Tip: python wpm_bot.py <speed> <language>")
-    print(f"   Example: python wpm_bot.py 0.02 javascript")
+    print(f"⌨️  Typing mode: {typing_mode}")
+    print(f"💡 Tip: python wpm_bot.py <speed> <language> [mode]")
+    print(f"   Example: python wpm_bot.py 0.02 javascript insert")
     
-    bot = WPMBot(typing_speed=typing_speed)
+    bot = WPMBot(typing_speed=typing_speed, typing_mode=typing_mode)
     bot.run(language=language)
 
 